@@ -0,0 +1,58 @@
+"""Sequential and parallel bring-up time of MotorManager against simulated drives.
+
+Runs the whole start_sync_all_motors, SDO configuration and state waits up to
+OPERATION_ENABLED, against a DriveSimulator on the python-can virtual bus.
+Each simulated drive answers SDO requests sdo_latency seconds after they
+arrive, from a worker thread of its own, so the per-node latency parallel
+bring-up hides is there. A first bring-up writes the PDO mapping; the timed
+ones that follow find it up to date. The fixed pauses of the bring-up are the
+same for every node count.
+"""
+import time
+import argparse
+from canopen_sdk.driver_registry import load_motor
+from canopen_sdk.manager import MotorManager
+from canopen_sdk.motor_config import MotorConfig
+from canopen_sdk.simulator import DriveSimulator
+
+def bring_up(motor_manager, parallel):
+    start = time.perf_counter()
+    motor_manager.start_sync_all_motors(0.01, parallel, timeout=60.0)
+    elapsed = time.perf_counter() - start
+    motor_manager.stop_sync_all_motors()
+    return elapsed
+
+def run(node_count, vendor_type, sdo_latency):
+    channel = f'bench_bring_up_{vendor_type}_{node_count}'
+    simulator = DriveSimulator(channel=channel)
+    for node_id in range(1, node_count + 1):
+        simulator.add_drive(node_id, vendor_type, sdo_latency=sdo_latency)
+    simulator.start()
+
+    # The virtual bus has no bitrate to overload
+    motor_manager = MotorManager(channel=channel, bustype='virtual', max_bus_load=float('inf'))
+    for node_id in range(1, node_count + 1):
+        motor_manager.add_motor(load_motor(MotorConfig.from_dict({'vendor_type': vendor_type, 'node_id': node_id})))
+
+    bring_up(motor_manager, parallel=True)
+    sequential = bring_up(motor_manager, parallel=False)
+    parallel = bring_up(motor_manager, parallel=True)
+
+    simulator.stop()
+    return sequential, parallel
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--vendor', default='eRob', choices=['eRob', 'elmo'], help='simulated drive type')
+    parser.add_argument('--sdo-latency', type=float, default=0.001,
+                        help='SDO response latency of every simulated drive in seconds')
+    args = parser.parse_args()
+
+    print(f"{'nodes':>5} {'sequential [s]':>15} {'parallel [s]':>13}")
+    for node_count in args.nodes:
+        sequential, parallel = run(node_count, args.vendor, args.sdo_latency)
+        print(f"{node_count:>5} {sequential:>15.3f} {parallel:>13.3f}")
+
+if __name__ == '__main__':
+    main()
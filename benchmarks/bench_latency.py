@@ -0,0 +1,141 @@
+"""End-to-end latency and jitter of MotorManager against simulated drives.
+
+Runs a DriveSimulator and a MotorManager on the python-can virtual bus for each
+node count and SYNC rate, and writes the results as JSON. Simulator and manager
+share one process, so absolute numbers include the simulator's own load.
+"""
+import json
+import time
+import argparse
+import statistics
+import can
+from canopen_sdk.driver_registry import load_motor
+from canopen_sdk.manager import MotorManager
+from canopen_sdk.motor_config import MotorConfig
+from canopen_sdk.simulator import DriveSimulator
+
+def summarize(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'mean': statistics.fmean(values),
+        'stdev': statistics.pstdev(values),
+        'p50': values[len(values) // 2],
+        'p99': values[min(int(len(values) * 0.99), len(values) - 1)],
+        'max': values[-1],
+    }
+
+def time_callbacks(motor, durations):
+    def timed_callback(callback):
+        def timed(message):
+            start = time.perf_counter()
+            callback(message)
+            durations.append(time.perf_counter() - start)
+        timed.__self__ = motor
+        return timed
+    # Only the motor's own callbacks, not the state table's
+    for pdo_map in motor.node.tpdo.map.values():
+        pdo_map.callbacks[:] = [timed_callback(callback) if getattr(callback, '__self__', None) is motor
+                                else callback for callback in pdo_map.callbacks]
+
+def run(node_count, sync_rate, duration, vendor_type='eRob'):
+    channel = f'bench_{vendor_type}_{node_count}_{sync_rate}'
+    simulator = DriveSimulator(channel=channel)
+    for node_id in range(1, node_count + 1):
+        simulator.add_drive(node_id, vendor_type)
+    simulator.start()
+    sniffer = can.Bus(interface='virtual', channel=channel)
+
+    # The virtual bus has no bitrate to overload
+    motor_manager = MotorManager(channel=channel, bustype='virtual', max_bus_load=float('inf'))
+    callback_durations = []
+    for node_id in range(1, node_count + 1):
+        motor = load_motor(MotorConfig.from_dict({'vendor_type': vendor_type, 'node_id': node_id,
+                                                  'profile_velocity': 6.28}))
+        motor_manager.add_motor(motor)
+
+    start = time.perf_counter()
+    motor_manager.start_sync_all_motors(1.0 / sync_rate, parallel=True, timeout=10.0)
+    bring_up_time = time.perf_counter() - start
+    for motor in motor_manager.motors.values():
+        time_callbacks(motor, callback_durations)
+    while sniffer.recv(0) is not None:
+        pass
+
+    # Command-to-wire latency
+    command_latencies = []
+    rpdo_cob_id = motor_manager.motors['joint_1'].node.rpdo[1].cob_id
+    for i in range(100):
+        sent_at = time.time()
+        motor_manager.set_position('joint_1', 0.001 * (i % 10))
+        message = sniffer.recv(1.0)
+        while message is not None and message.arbitration_id != rpdo_cob_id:
+            message = sniffer.recv(1.0)
+        if message is not None:
+            command_latencies.append(message.timestamp - sent_at)
+
+    # TPDO-to-get_positions visibility latency and SYNC period jitter
+    visibility_latencies = []
+    sync_timestamps = []
+    state_view = motor_manager.get_state_view('timestamp')
+    last_timestamp = state_view[0]
+    end = time.time() + duration
+    while time.time() < end:
+        if state_view[0] != last_timestamp:
+            last_timestamp = state_view[0]
+            motor_manager.get_positions()
+            visibility_latencies.append(time.time() - last_timestamp)
+        message = sniffer.recv(0)
+        while message is not None:
+            if message.arbitration_id == 0x80:
+                sync_timestamps.append(message.timestamp)
+            message = sniffer.recv(0)
+        time.sleep(0)
+    sync_periods = [b - a for a, b in zip(sync_timestamps, sync_timestamps[1:])]
+
+    result = {
+        'vendor_type': vendor_type,
+        'node_count': node_count,
+        'sync_rate': sync_rate,
+        'bring_up_time': bring_up_time,
+        'command_to_wire_latency': summarize(command_latencies),
+        'tpdo_to_get_positions_latency': summarize(visibility_latencies),
+        'sync_period': summarize(sync_periods),
+        'sync_jitter': summarize([abs(period - 1.0 / sync_rate) for period in sync_periods]),
+        'callback_time_per_frame': summarize(list(callback_durations)),
+        'sync_statistics': motor_manager.sync_producer.get_statistics(),
+        'incomplete_cycles': motor_manager.state_table.incomplete_cycles,
+    }
+
+    motor_manager.stop_sync_all_motors()
+    sniffer.shutdown()
+    simulator.stop()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--rates', type=int, nargs='+', default=[100, 250, 500])
+    parser.add_argument('--vendor', default='eRob', choices=['eRob', 'elmo'], help='simulated drive type')
+    parser.add_argument('--duration', type=float, default=1.0, help='measurement time per run in seconds')
+    parser.add_argument('--output', default='bench_latency.json')
+    args = parser.parse_args()
+
+    results = []
+    for node_count in args.nodes:
+        for sync_rate in args.rates:
+            result = run(node_count, sync_rate, args.duration, args.vendor)
+            results.append(result)
+            print(f"nodes={node_count:>3} rate={sync_rate:>4} Hz "
+                  f"bring-up={result['bring_up_time']:.2f} s "
+                  f"wire={result['command_to_wire_latency']['p50'] * 1e6:.0f} us "
+                  f"visibility={result['tpdo_to_get_positions_latency']['p50'] * 1e6:.0f} us "
+                  f"jitter={result['sync_jitter']['p99'] * 1e6:.0f} us (p99)")
+
+    with open(args.output, 'w') as f:
+        json.dump({'created': time.time(), 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
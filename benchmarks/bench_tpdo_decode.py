@@ -0,0 +1,63 @@
+import os
+import time
+import types
+import canopen
+from canopen_sdk.erob import EROB
+from canopen_sdk.common import PdoDecoder
+
+SYNC_RATE = 1000
+NODE_COUNT = 32
+FRAMES = 200000
+
+def legacy_tpdo_1_decode(data):
+    position = int.from_bytes(data[0:4], byteorder='little', signed=True)
+    velocity = int.from_bytes(data[4:8], byteorder='little', signed=True)
+    return position, velocity
+
+def legacy_tpdo_2_decode(data):
+    statusword = int.from_bytes(data[0:2], byteorder='little', signed=False)
+    torque = int.from_bytes(data[2:4], byteorder='little', signed=True)
+    return statusword, torque
+
+def time_per_frame(function, argument):
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        function(argument)
+    return (time.perf_counter() - start) / FRAMES
+
+def main():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    file_path = os.path.join(base_dir, 'canopen_sdk', 'erob', 'ZeroErr_Driver_V1.5.eds')
+
+    network = canopen.Network()
+    motor = EROB(1, file_path, pulse_per_revolution=524288)
+    motor.node = network.add_node(motor.node_id, file_path)
+    motor.network = network
+    motor.build_pdo_mapping()
+    motor.add_pdo_callback()
+
+    # Default plan: position and velocity in TPDO 1, statusword and torque in TPDO 2
+    tpdo_1 = types.SimpleNamespace(data=bytearray(b'\x10\x32\x54\x76\x10\x32\x54\xf6'), timestamp=1.0)
+    tpdo_2 = types.SimpleNamespace(data=bytearray(b'\x37\x02\x2c\x01'), timestamp=1.0)
+    decode_tpdo_1 = PdoDecoder(motor.node.tpdo[1]).decode
+    decode_tpdo_2 = PdoDecoder(motor.node.tpdo[2]).decode
+    tpdo_1_callback = motor.node.tpdo[1].callbacks[0]
+    tpdo_2_callback = motor.node.tpdo[2].callbacks[0]
+
+    results = [
+        ('legacy decode TPDO1', time_per_frame(legacy_tpdo_1_decode, tpdo_1.data)),
+        ('struct decode TPDO1', time_per_frame(decode_tpdo_1, tpdo_1.data)),
+        ('legacy decode TPDO2', time_per_frame(legacy_tpdo_2_decode, tpdo_2.data)),
+        ('struct decode TPDO2', time_per_frame(decode_tpdo_2, tpdo_2.data)),
+        ('TPDO1 callback', time_per_frame(tpdo_1_callback, tpdo_1)),
+        ('TPDO2 callback', time_per_frame(tpdo_2_callback, tpdo_2)),
+    ]
+
+    # Two TPDOs per node per SYNC
+    frame_rate = SYNC_RATE * NODE_COUNT * 2
+    print(f"{frame_rate} frames/s ({SYNC_RATE} Hz x {NODE_COUNT} nodes x 2 TPDOs)")
+    for name, seconds in results:
+        print(f"{name:>20}: {seconds * 1e9:8.1f} ns/frame, {seconds * frame_rate * 100:5.1f} % of one core")
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,10 @@
 from canopen_sdk.common.base_motor_interface import BaseMotorInterface
+from canopen_sdk.common.pdo_decoder import PdoDecoder
+from canopen_sdk.common.motor_status import MotorStatus
+from canopen_sdk.common.error_codes import decode_error_code
+from canopen_sdk.common.metrics import Histogram, MotorMetrics
+from canopen_sdk.common.object_dictionary_cache import ObjectDictionaryCache
+from canopen_sdk.common.pdo_planner import BusOverloadError, PdoSignal, plan_pdos, predict_bus_load
 
-__all__ = ['BaseMotorInterface']
\ No newline at end of file
+__all__ = ['BaseMotorInterface', 'PdoDecoder', 'MotorStatus', 'decode_error_code', 'Histogram',
+           'MotorMetrics', 'ObjectDictionaryCache', 'BusOverloadError', 'PdoSignal', 'plan_pdos', 'predict_bus_load']
\ No newline at end of file
@@ -1,8 +1,16 @@
 import os
 import time
 import ctypes
+import threading
+from array import array
 from abc import ABC, abstractmethod
-from canopen_sdk.logger import Logger
+from canopen_sdk.logger import AsyncLogger
+from canopen_sdk.common.metrics import MotorMetrics
+from canopen_sdk.common.error_codes import decode_error_code
+from canopen_sdk.common.motor_status import MotorStatus
+from canopen_sdk.common.pdo_decoder import PdoDecoder
+from canopen_sdk.common.pdo_planner import PdoSignal, plan_pdos
+from canopen_sdk.common.pdo_config import pdo_config, read_pdo_config
 
 class BaseMotorInterface(ABC):
     OPERATION_MODES = {
@@ -16,10 +24,50 @@ class BaseMotorInterface(ABC):
         'CYCLIC_SYNC_TORQUE':    0x0A
     }
 
+    # CiA 402 state: (statusword mask, statusword value)
+    STATES = {
+        'NOT_READY_TO_SWITCH_ON': (0x4F, 0x00),
+        'SWITCH_ON_DISABLED':     (0x4F, 0x40),
+        'READY_TO_SWITCH_ON':     (0x6F, 0x21),
+        'SWITCHED_ON':            (0x6F, 0x23),
+        'OPERATION_ENABLED':      (0x6F, 0x27),
+        'QUICK_STOP_ACTIVE':      (0x6F, 0x07),
+        'FAULT_REACTION_ACTIVE':  (0x4F, 0x0F),
+        'FAULT':                  (0x4F, 0x08)
+    }
+
+    # Order of the fields of a joint in a state table
+    STATE_FIELDS = ('position', 'velocity', 'acceleration', 'torque', 'statusword', 'timestamp')
+
+    # Manufacturer specific emergency error codes, {code: description}
+    ERROR_CODES = {}
+
+    # Objects the TPDOs carry, {signal: object name}, each value is passed to on_<signal>
+    TPDO_SIGNALS = {}
+
+    # Schema of the telemetry log, one record per position sample
+    LOG_KEYS = ('timestamp', 'position', 'velocity', 'acceleration', 'torque', 'statusword')
+
+    # Every attribute is a slot, so motors carry no per-instance __dict__. Vendor
+    # drivers declare __slots__ for the attributes they add
+    __slots__ = ('node_id', 'object_dictionary_file_path', 'name', 'pulse_per_revolution',
+                 'profile_velocity', 'profile_acceleration', 'profile_deceleration',
+                 'min_position_limit', 'max_position_limit', 'start_position', 'parameters',
+                 'tpdo_intervals', 'tpdo_plan', 'node', 'network',
+                 'state', 'state_index', 'state_stride', 'position_slot', 'velocity_slot',
+                 'acceleration_slot', 'torque_slot', 'statusword_slot', 'timestamp_slot',
+                 'zero_offset', 'PulseToRad', 'RadToPulse', 'operation_mode', 'dt', 'velocity_interval',
+                 'previous_velocity', 'previous_velocity_timestamp', 'motor_status',
+                 'motor_rated_current', 'error_code', 'error_register', 'error_description',
+                 'error_timestamp', 'state_timeout', 'pdo_callback_added', 'position_staged',
+                 'torque_staged', 'commands_inhibited', 'target_position_pdo', 'command_lock',
+                 'statusword_condition', 'statusword_callbacks', 'log_file_path', 'logger',
+                 'metrics', '__weakref__')
+
     def __init__(self, node_id, object_dictionary_file_path, 
                  name=None, pulse_per_revolution=1000, zero_offset=0, operation_mode='PROFILE_POSITION',
                  profile_velocity=1.0, profile_acceleration=1.0, profile_deceleration=1.0,
-                 min_position_limit=-1.0, max_position_limit=1.0):
+                 min_position_limit=-1.0, max_position_limit=1.0, parameters=None, tpdo_intervals=None):
         self.node_id = node_id
         self.object_dictionary_file_path = object_dictionary_file_path
         self.name = name if name is not None else f"joint_{node_id}"
@@ -32,34 +80,73 @@ class BaseMotorInterface(ABC):
         self.min_position_limit = min_position_limit
         self.max_position_limit = max_position_limit
         self.start_position = 0.0
+
+        # Extra drive parameters from the motor config, {object: raw value}
+        self.parameters = dict(parameters or {})
+
+        # SYNC interval of slow TPDO signals from the motor config, {signal: N}
+        self.tpdo_intervals = dict(tpdo_intervals or {})
+        self.tpdo_plan = []
+        self.velocity_interval = 1
         
         self.node = None
         self.network = None
         self.dt = 0.01
-        self.current_position = 0
-        self.current_velocity = 0
+        self.bind_state(array('d', bytes(8 * len(self.STATE_FIELDS))), 0, 1)
         self.previous_velocity = 0
-        self.current_acceleration = 0
-        self.current_torque = 0
+        self.previous_velocity_timestamp = 0.0
         self.motor_rated_current = 0
-        self.motor_status = {
-            'statusword': None,
-            #'ready_to_switch_on': 0,
-            #'switched_on': 0,
-            'operation_enabled': 0,
-            'fault': 0,
-            #'voltage_enabled': 0,
-            #'quick_stop': 0,
-            'switch_on_disabled': 0,
-            #'warning': 0,
-        }
+        self.motor_status = MotorStatus()
+        # Latest emergency error, updated by on_emcy
         self.error_code = 0
+        self.error_register = 0
+        self.error_description = decode_error_code(0)
+        self.error_timestamp = None
+        self.state_timeout = 1.0
+        self.pdo_callback_added = False
+        self.statusword_condition = threading.Condition()
+        self.statusword_callbacks = []
+        self.command_lock = threading.Lock()
+        self.target_position_pdo = None
+        self.position_staged = False
+        self.torque_staged = False
+        self.commands_inhibited = False
         base_dir   = os.path.dirname(os.path.abspath(__file__))
         parent_dir = os.path.dirname(base_dir)
         parent_dir = os.path.dirname(parent_dir)
-        file_path  = os.path.join(parent_dir, 'logs', f'{self.name}.csv')
-        #self.logger = Logger(file_path)
+        self.log_file_path = os.path.join(parent_dir, 'logs', f'{self.name}.csv')
+        self.logger = None
+        self.metrics = None
         
+    def bind_state(self, state, index, stride):
+        """Keep the state of this motor in column index of a state table with stride joints"""
+        field_count = len(self.STATE_FIELDS)
+        if getattr(self, 'state', None) is not None:
+            # Carry the latest values over to the new table
+            for i in range(field_count):
+                state[index + i * stride] = self.state[self.state_index + i * self.state_stride]
+        self.state = state
+        self.state_index = index
+        self.state_stride = stride
+        self.position_slot, self.velocity_slot, self.acceleration_slot, self.torque_slot, \
+            self.statusword_slot, self.timestamp_slot = range(index, index + field_count * stride, stride)
+
+    @property
+    def current_position(self):
+        return self.state[self.position_slot]
+
+    @property
+    def current_velocity(self):
+        return self.state[self.velocity_slot]
+
+    @property
+    def current_acceleration(self):
+        return self.state[self.acceleration_slot]
+
+    @property
+    def current_torque(self):
+        return self.state[self.torque_slot]
+
     @abstractmethod
     def initialize_motor(self):
         """Initialize motor"""
@@ -70,11 +157,126 @@ class BaseMotorInterface(ABC):
         """Reset motor"""
         pass
     
+    @abstractmethod
+    def build_pdo_mapping(self):
+        """Build the PDO mapping locally, without bus I/O"""
+        pass
+
     @abstractmethod
     def setup_pdo_mapping(self):
         """Set PDO mapping"""
         pass
 
+    def apply_pdo_mapping(self):
+        """Save only the PDOs built by build_pdo_mapping whose parameters differ from the drive"""
+        pdo_maps = [
+            pdo_map
+            for pdo_maps in (self.node.tpdo.map, self.node.rpdo.map)
+            for pdo_map in pdo_maps.values() if pdo_map.cob_id is not None
+        ]
+        configs = [pdo_config(pdo_map) for pdo_map in pdo_maps]
+        changed = [
+            pdo_map for pdo_map, config in zip(pdo_maps, configs)
+            if read_pdo_config(pdo_map) != config
+        ]
+
+        # PDO mapping can only be changed in PRE-OPERATIONAL
+        if changed:
+            self.node.nmt.state = 'PRE-OPERATIONAL'
+            for pdo_map in changed:
+                pdo_map.save()
+            self.node.nmt.state = 'OPERATIONAL'
+        return changed
+
+    def plan_tpdo_mapping(self):
+        """Pack TPDO_SIGNALS into the fewest TPDOs, the signals in tpdo_intervals on every Nth SYNC"""
+        unknown = sorted(set(self.tpdo_intervals) - set(self.TPDO_SIGNALS))
+        if unknown:
+            raise ValueError(f"{self.name}: unknown TPDO signals {unknown}")
+        signals = [
+            PdoSignal(signal, len(self.node.object_dictionary[name]), self.tpdo_intervals.get(signal, 1))
+            for signal, name in self.TPDO_SIGNALS.items()
+        ]
+        return plan_pdos(signals, len(self.node.tpdo.map))
+
+    def check_configuration(self):
+        """Resolve the parameters and plan the TPDOs against the object dictionary, without bus I/O,
+        so a bad config fails before bring-up
+        """
+        for key in self.parameters:
+            try:
+                self.find_parameter(key)
+            except (KeyError, ValueError):
+                raise ValueError(f"{self.name}: parameter {key!r} is not in the object dictionary") from None
+        self.tpdo_plan = self.plan_tpdo_mapping()
+
+    def build_tpdo_mapping(self):
+        """Map the planned TPDOs and disable the TPDOs left over"""
+        self.tpdo_plan = self.plan_tpdo_mapping()
+        for number, pdo_map in self.node.tpdo.map.items():
+            pdo_map.clear()
+            pdo_map.cob_id = 0x80 + 0x100 * number + self.node_id
+            pdo_map.trans_type = 1
+            pdo_map.event_timer = 0
+            pdo_map.enabled = number <= len(self.tpdo_plan)
+            if pdo_map.enabled:
+                planned = self.tpdo_plan[number - 1]
+                for signal in planned.signals:
+                    pdo_map.add_variable(self.TPDO_SIGNALS[signal.name])
+                pdo_map.trans_type = planned.trans_type
+                if any(signal.name == 'velocity' for signal in planned.signals):
+                    # Acceleration is the velocity difference over this many SYNC periods
+                    self.velocity_interval = planned.sync_interval
+
+    def add_tpdo_callbacks(self):
+        """Subscribe to the planned TPDOs"""
+        for number in range(1, len(self.tpdo_plan) + 1):
+            pdo_map = self.node.tpdo[number]
+            self.network.subscribe(pdo_map.cob_id, pdo_map.on_message)
+            pdo_map.add_callback(self.tpdo_callback(pdo_map))
+        self.pdo_callback_added = True
+
+    def remove_tpdo_callbacks(self):
+        """Unsubscribe from the TPDOs and forget the cached statusword, so the next
+        bring-up polls by SDO until fresh TPDOs arrive
+        """
+        if self.node is not None:
+            for pdo_map in self.node.tpdo.map.values():
+                pdo_map.callbacks[:] = [callback for callback in pdo_map.callbacks
+                                        if getattr(callback, '__self__', None) is not self]
+                subscribers = self.network.subscribers.get(pdo_map.cob_id, ())
+                if pdo_map.on_message in subscribers:
+                    self.network.unsubscribe(pdo_map.cob_id, pdo_map.on_message)
+        self.pdo_callback_added = False
+        self.motor_status.statusword = None
+
+    def tpdo_callback(self, pdo_map):
+        """Callback decoding a TPDO with one precompiled struct into the on_<signal> methods"""
+        decode = PdoDecoder(pdo_map).decode
+        signals = {name: signal for signal, name in self.TPDO_SIGNALS.items()}
+        handlers = tuple(getattr(self, f'on_{signals[var.name]}') for var in pdo_map.map)
+
+        # Unrolled for PDOs of one or two signals, where the loop would cost as much as the handlers
+        if len(handlers) == 1:
+            handler, = handlers
+            def callback(message):
+                handler(decode(message.data)[0], message.timestamp)
+        elif len(handlers) == 2:
+            first, second = handlers
+            def callback(message):
+                first_value, second_value = decode(message.data)
+                timestamp = message.timestamp
+                first(first_value, timestamp)
+                second(second_value, timestamp)
+        else:
+            def callback(message):
+                timestamp = message.timestamp
+                for handler, value in zip(handlers, decode(message.data)):
+                    handler(value, timestamp)
+        # Marks the callback as the motor's own, see MotorMetrics.instrument
+        callback.__self__ = self
+        return callback
+
     @abstractmethod
     def add_pdo_callback(self):
         """Add PDO callback to the network"""
@@ -90,6 +292,31 @@ class BaseMotorInterface(ABC):
         """quick stop"""
         pass
 
+    @abstractmethod
+    def transmit_quick_stop(self):
+        """Send quick stop by RPDO without waiting and drop staged commands until release_commands"""
+        pass
+
+    def release_commands(self):
+        """Let transmit_command send staged commands again after transmit_quick_stop"""
+        with self.command_lock:
+            self.commands_inhibited = False
+
+    @abstractmethod
+    def stage_position(self, value):
+        """Write target position into the RPDO without transmitting it"""
+        pass
+
+    @abstractmethod
+    def stage_torque(self, value):
+        """Write target torque into the RPDO without transmitting it"""
+        pass
+
+    @abstractmethod
+    def transmit_command(self):
+        """Transmit the staged RPDOs without waiting"""
+        pass
+
     @abstractmethod
     def set_position(self, value):
         """Set motor position"""
@@ -118,6 +345,112 @@ class BaseMotorInterface(ABC):
         """Set dt"""
         self.dt = value
 
+    def set_state_timeout(self, value=1.0):
+        """Set how long to wait for the drive to confirm a state transition"""
+        self.state_timeout = value
+
+    def add_statusword_callback(self, callback):
+        """Call callback(motor, previous_statusword, statusword) on every statusword change"""
+        # Replaced, not changed in place, so the receive thread can iterate without a lock
+        self.statusword_callbacks = self.statusword_callbacks + [callback]
+
+    def remove_statusword_callback(self, callback):
+        if callback in self.statusword_callbacks:
+            self.statusword_callbacks = [other for other in self.statusword_callbacks if other != callback]
+
+    def notify_statusword(self, previous_statusword=None):
+        """Wake up threads waiting for a statusword change and run the statusword callbacks,
+        called from the TPDO callback
+        """
+        with self.statusword_condition:
+            self.statusword_condition.notify_all()
+        statusword = self.motor_status.statusword
+        for callback in self.statusword_callbacks:
+            callback(self, previous_statusword, statusword)
+
+    def read_statusword(self):
+        """Read statusword over SDO"""
+        return self.node.sdo[0x6041].raw
+
+    def wait_for_statusword(self, predicate, description, timeout=None):
+        """Wait until predicate(statusword) holds, from TPDO once mapped otherwise by SDO polling"""
+        timeout = self.state_timeout if timeout is None else timeout
+        if self.pdo_callback_added:
+            status = self.motor_status
+            with self.statusword_condition:
+                reached = self.statusword_condition.wait_for(
+                    lambda: status.statusword is not None and predicate(status.statusword),
+                    timeout)
+            statusword = status.statusword
+        else:
+            deadline = time.monotonic() + timeout
+            while True:
+                statusword = self.read_statusword()
+                reached = predicate(statusword)
+                if reached or time.monotonic() >= deadline:
+                    break
+        if not reached:
+            raise TimeoutError(f"{self.name}: {description} not confirmed within {timeout} s "
+                               f"(statusword={statusword})")
+        return statusword
+
+    def wait_for_state(self, state, timeout=None):
+        """Wait until the drive reports the given CiA 402 state"""
+        mask, value = self.STATES[state]
+        return self.wait_for_statusword(lambda statusword: statusword & mask == value, state, timeout)
+
+    def wait_for_fault_cleared(self, timeout=None):
+        """Wait until the fault bit of the statusword is cleared"""
+        return self.wait_for_statusword(lambda statusword: not statusword & (1 << 3), 'fault reset', timeout)
+
+    def wait_for_operation_mode(self, timeout=None):
+        """Wait until modes of operation display reports the configured mode"""
+        timeout = self.state_timeout if timeout is None else timeout
+        mode = self.OPERATION_MODES[self.operation_mode]
+        deadline = time.monotonic() + timeout
+        while self.node.sdo[0x6061].raw != mode:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"{self.name}: {self.operation_mode} not confirmed within {timeout} s")
+
+    def get_parameters(self):
+        """Parameters written by apply_parameters, as (object, raw value) pairs in write order"""
+        return list(self.parameters.items())
+
+    def find_parameter(self, key):
+        """SDO variable of a parameter given by name ('Name' or 'Name.Subname'), index or
+        (index, subindex), or as a hex string ('0x6065' or '0x607D.1')
+        """
+        if isinstance(key, str) and key.lower().startswith('0x'):
+            index, _, subindex = key.partition('.')
+            key = (int(index, 16), int(subindex, 0)) if subindex else int(index, 16)
+        if isinstance(key, tuple):
+            return self.node.sdo[key[0]][key[1]]
+        return self.node.sdo[key]
+
+    def apply_parameters(self, parameters):
+        """Write parameters over SDO"""
+        for key, value in parameters:
+            self.find_parameter(key).raw = value
+
+    def is_cyclic_mode(self):
+        """Whether the operation mode takes a new set-point every SYNC period"""
+        return self.operation_mode.startswith('CYCLIC_SYNC') or self.is_interpolated_mode()
+
+    def is_interpolated_mode(self):
+        """Whether the drive interpolates between set-points itself"""
+        return self.operation_mode == 'INTERPOLATED_POSITION'
+
+    def set_cycle_period(self, period):
+        """Write the SYNC period to the communication cycle period and interpolation time period"""
+        self.node.sdo[0x1006].raw = int(round(period * 1e6))
+        milliseconds = int(round(period * 1e3))
+        if 0 < milliseconds <= 0xFF:
+            self.node.sdo[0x60C2][1].raw = milliseconds
+            self.node.sdo[0x60C2][2].raw = -3
+        else:
+            self.node.sdo[0x60C2][1].raw = min(int(round(period * 1e2)), 0xFF)
+            self.node.sdo[0x60C2][2].raw = -2
+
     def pause_for_seconds(self, value):
         """Pauses execution for the given number of seconds to complete the command write"""
         time.sleep(value)
@@ -133,6 +466,10 @@ class BaseMotorInterface(ABC):
     def to_signed_int32(self, value):
         """convert a value to a signed 32-bit integer"""
         return ctypes.c_int32(int(value)).value
+
+    def to_signed_int16(self, value):
+        """convert a value to a signed 16-bit integer"""
+        return ctypes.c_int16(int(value)).value
     
     def get_position(self):
         """Get motor position"""
@@ -156,6 +493,7 @@ class BaseMotorInterface(ABC):
 
     def get_motor_state(self):
         """Get motor state"""
+        status = self.motor_status
         return {
             #'node_id': self.node_id,
             #'name': self.name,
@@ -163,30 +501,63 @@ class BaseMotorInterface(ABC):
             'velocity': self.current_velocity,
             'acceleration': self.current_acceleration,
             'torque': self.current_torque,
-            'statusword': self.motor_status['statusword'],
-            #'ready_to_switch_on': self.motor_status['ready_to_switch_on'],
-            #'switched_on': self.motor_status['switched_on'],
-            'operation_enabled': self.motor_status['operation_enabled'],
-            'fault': self.motor_status['fault'],
-            #'voltage_enabled': self.motor_status['voltage_enabled'],
-            #'quick_stop': self.motor_status['quick_stop'],
-            'switch_on_disabled': self.motor_status['switch_on_disabled'],
-            #'warning': self.motor_status['warning'],
+            'statusword': status.statusword,
+            'operation_enabled': status.operation_enabled,
+            'fault': status.fault,
+            'switch_on_disabled': status.switch_on_disabled,
         }
  
+    def on_emcy(self, emcy):
+        """Cache the error of an EMCY frame, called from the receive thread"""
+        self.error_register = emcy.register
+        self.error_description = decode_error_code(emcy.code, self.ERROR_CODES)
+        self.error_timestamp = emcy.timestamp
+        self.error_code = emcy.code
+
     def get_error_code(self):
-        """Get Error Code"""
-        # Error Code
-        self.error_code = self.node.sdo['Error Code'].raw
-        self.pause_for_seconds(0.1)
+        """Get the error code of the latest EMCY, without bus traffic"""
         return self.error_code
+
+    def get_error(self):
+        """Get the latest EMCY error with its decoded description"""
+        return {
+            'error_code': self.error_code,
+            'error_register': self.error_register,
+            'description': self.error_description,
+            'timestamp': self.error_timestamp,
+        }
+
+    def read_error_code(self):
+        """Read Error Code over SDO and update the cached error"""
+        error_code = self.node.sdo[0x603F].raw
+        if error_code != self.error_code:
+            self.error_description = decode_error_code(error_code, self.ERROR_CODES)
+            self.error_timestamp = time.time()
+            self.error_code = error_code
+        return error_code
         
     @abstractmethod
     def reset_node_id(self, node_id):
         """"Reset the node ID"""
         pass
         
+    def open_logger(self, file_path=None, file_format='csv', **kwargs):
+        """Log the motor state on every TPDO 1 from a background writer thread"""
+        self.close_logger()
+        if file_path is None:
+            file_path = self.log_file_path if file_format == 'csv' else os.path.splitext(self.log_file_path)[0] + '.bin'
+        self.logger = AsyncLogger(file_path, self.LOG_KEYS, file_format, **kwargs)
+
+    def enable_metrics(self, callback_sample_interval=16):
+        """Count frames, transmits and SDO round trips of this motor, see MotorMetrics"""
+        if self.metrics is None:
+            self.metrics = MotorMetrics(self, callback_sample_interval)
+        if self.node is not None:
+            self.metrics.instrument()
+        return self.metrics
+
     def close_logger(self):
-        pass
         """Close logger"""
-        #self.logger.close()
+        if self.logger is not None:
+            self.logger.close()
+            self.logger = None
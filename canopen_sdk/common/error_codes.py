@@ -0,0 +1,71 @@
+# Emergency error codes of CiA 301 and the CiA 402 drive profile
+STANDARD_ERROR_CODES = {
+    0x0000: 'Error reset or no error',
+    0x1000: 'Generic error',
+    0x2000: 'Current',
+    0x2100: 'Current, device input side',
+    0x2200: 'Current inside the device',
+    0x2300: 'Current, device output side',
+    0x2310: 'Continuous over current',
+    0x2320: 'Short circuit/earth leakage',
+    0x2330: 'Earth leakage',
+    0x2340: 'Short circuit',
+    0x3000: 'Voltage',
+    0x3100: 'Mains voltage',
+    0x3110: 'Mains over-voltage',
+    0x3120: 'Mains under-voltage',
+    0x3200: 'Voltage inside the device',
+    0x3210: 'DC link over-voltage',
+    0x3220: 'DC link under-voltage',
+    0x3300: 'Output voltage',
+    0x4000: 'Temperature',
+    0x4100: 'Ambient temperature',
+    0x4200: 'Device temperature',
+    0x4210: 'Excess temperature device',
+    0x4300: 'Drive temperature',
+    0x4310: 'Excess temperature drive',
+    0x5000: 'Device hardware',
+    0x5530: 'Data storage',
+    0x6000: 'Device software',
+    0x6100: 'Internal software',
+    0x6200: 'User software',
+    0x6300: 'Data set',
+    0x6320: 'Parameter error',
+    0x7000: 'Additional modules',
+    0x7100: 'Power',
+    0x7120: 'Motor',
+    0x7121: 'Motor blocked',
+    0x7300: 'Sensor',
+    0x7305: 'Incremental sensor 1 fault',
+    0x7310: 'Speed',
+    0x7320: 'Position',
+    0x8000: 'Monitoring',
+    0x8100: 'Communication',
+    0x8110: 'CAN overrun (objects lost)',
+    0x8120: 'CAN in error passive mode',
+    0x8130: 'Life guard error or heartbeat error',
+    0x8140: 'Recovered from bus off',
+    0x8150: 'CAN-ID collision',
+    0x8200: 'Protocol error',
+    0x8210: 'PDO not processed due to length error',
+    0x8220: 'PDO length exceeded',
+    0x8240: 'Unexpected SYNC data length',
+    0x8250: 'RPDO timeout',
+    0x8400: 'Velocity speed controller',
+    0x8500: 'Position controller',
+    0x8600: 'Positioning controller',
+    0x8611: 'Following error',
+    0x8612: 'Reference limit',
+    0x9000: 'External error',
+    0xF000: 'Additional functions',
+    0xFF00: 'Device specific',
+}
+
+def decode_error_code(code, vendor_error_codes=None):
+    """Describe an emergency error code, vendor codes first then the closest standard class"""
+    if vendor_error_codes and code in vendor_error_codes:
+        return vendor_error_codes[code]
+    for mask in (0xFFFF, 0xFFF0, 0xFF00, 0xF000):
+        if code & mask in STANDARD_ERROR_CODES:
+            return STANDARD_ERROR_CODES[code & mask]
+    return f"Unknown error 0x{code:04X}"
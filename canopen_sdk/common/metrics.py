@@ -0,0 +1,194 @@
+import time
+import json
+from bisect import bisect_left
+
+# Bucket upper bounds in seconds, from 10 us to 10 s
+DEFAULT_BUCKETS = (1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4, 1e-3, 2e-3, 5e-3,
+                   1e-2, 2e-2, 5e-2, 1e-1, 2e-1, 5e-1, 1.0, 10.0)
+
+class Histogram:
+    """Fixed-bucket histogram, observe() only bisects and increments"""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        return {
+            'buckets': list(self.buckets),
+            'counts': list(self.counts),
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+        }
+
+class PdoMetrics:
+    def __init__(self):
+        self.frames = 0
+        self.missed_sync_cycles = 0
+        self.last_timestamp = None
+        self.inter_arrival = Histogram()
+        self.callback_time = Histogram()
+
+    def snapshot(self):
+        return {
+            'frames': self.frames,
+            'missed_sync_cycles': self.missed_sync_cycles,
+            'inter_arrival': self.inter_arrival.snapshot(),
+            'callback_time': self.callback_time.snapshot(),
+        }
+
+class MotorMetrics:
+    """Per-node counters and histograms of one motor.
+
+    Nothing is measured until instrument() wraps the motor's TPDO callbacks,
+    RPDO transmits and SDO transfers, so motors without metrics pay nothing.
+    Callback execution time is sampled every callback_sample_interval frames.
+    """
+    def __init__(self, motor, callback_sample_interval=16):
+        self.motor = motor
+        self.callback_sample_interval = callback_sample_interval
+        self.tpdo = {}
+        self.rpdo_transmits = {}
+        self.sdo_round_trip = Histogram()
+        self.sdo_errors = 0
+
+    def instrument(self):
+        """Wrap the TPDO callbacks, RPDO transmits and SDO transfers of the motor"""
+        node = self.motor.node
+        for number, pdo_map in node.tpdo.map.items():
+            pdo_map.callbacks[:] = [
+                self.instrument_tpdo(number, callback, pdo_map)
+                if getattr(callback, '__self__', None) is self.motor
+                and not hasattr(callback, 'metrics') else callback
+                for callback in pdo_map.callbacks
+            ]
+        for number, pdo_map in node.rpdo.map.items():
+            if 'transmit' not in vars(pdo_map):
+                pdo_map.transmit = self.instrument_rpdo(number, pdo_map.transmit)
+        if 'upload' not in vars(node.sdo):
+            node.sdo.upload = self.instrument_sdo(node.sdo.upload)
+            node.sdo.download = self.instrument_sdo(node.sdo.download)
+
+    def instrument_tpdo(self, number, callback, pdo_map):
+        metrics = self.tpdo.setdefault(number, PdoMetrics())
+        motor = self.motor
+        # Synchronous TPDOs are sent on every trans_type-th SYNC
+        sync_interval = pdo_map.trans_type if pdo_map.trans_type and pdo_map.trans_type <= 240 else 1
+        sample_interval = self.callback_sample_interval
+        perf_counter = time.perf_counter
+
+        def instrumented(message):
+            metrics.frames += 1
+            timestamp = message.timestamp
+            if metrics.last_timestamp is not None:
+                gap = timestamp - metrics.last_timestamp
+                metrics.inter_arrival.observe(gap)
+                period = motor.dt * sync_interval
+                if gap > 1.5 * period:
+                    metrics.missed_sync_cycles += int(gap / period + 0.5) - 1
+            metrics.last_timestamp = timestamp
+
+            if metrics.frames % sample_interval:
+                callback(message)
+            else:
+                start = perf_counter()
+                callback(message)
+                metrics.callback_time.observe(perf_counter() - start)
+        instrumented.__self__ = motor
+        instrumented.metrics = metrics
+        return instrumented
+
+    def instrument_rpdo(self, number, transmit):
+        rpdo_transmits = self.rpdo_transmits
+
+        def instrumented():
+            rpdo_transmits[number] = rpdo_transmits.get(number, 0) + 1
+            transmit()
+        return instrumented
+
+    def instrument_sdo(self, transfer):
+        perf_counter = time.perf_counter
+
+        def instrumented(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return transfer(*args, **kwargs)
+            except Exception:
+                self.sdo_errors += 1
+                raise
+            finally:
+                self.sdo_round_trip.observe(perf_counter() - start)
+        return instrumented
+
+    def snapshot(self):
+        return {
+            'node_id': self.motor.node_id,
+            'tpdo': {number: metrics.snapshot() for number, metrics in self.tpdo.items()},
+            'rpdo_transmits': dict(self.rpdo_transmits),
+            'sdo_round_trip': self.sdo_round_trip.snapshot(),
+            'sdo_errors': self.sdo_errors,
+        }
+
+def to_json(snapshot):
+    """Export a MotorManager.get_metrics() snapshot as JSON"""
+    return json.dumps(snapshot, indent=2)
+
+def to_prometheus(snapshot, prefix='canopen_sdk'):
+    """Export a MotorManager.get_metrics() snapshot in the Prometheus text format"""
+    # Samples grouped per metric family, as the text format requires
+    families = {}
+
+    def labels_text(labels):
+        return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+    def family(name, kind):
+        metric = f"{prefix}_{name}"
+        if metric not in families:
+            families[metric] = [f"# TYPE {metric} {kind}"]
+        return metric, families[metric]
+
+    def add(name, kind, labels, value):
+        metric, lines = family(name, kind)
+        lines.append(f"{metric}{{{labels_text(labels)}}} {value}")
+
+    def add_histogram(name, labels, histogram):
+        metric, lines = family(name, 'histogram')
+        cumulative = 0
+        for bound, count in zip(list(histogram['buckets']) + ['+Inf'], histogram['counts']):
+            cumulative += count
+            lines.append(f"{metric}_bucket{{{labels_text({**labels, 'le': bound})}}} {cumulative}")
+        lines.append(f"{metric}_sum{{{labels_text(labels)}}} {histogram['sum']}")
+        lines.append(f"{metric}_count{{{labels_text(labels)}}} {histogram['count']}")
+
+    for name, motor in snapshot['motors'].items():
+        labels = {'motor': name, 'node': motor['node_id']}
+        for number, pdo in motor['tpdo'].items():
+            pdo_labels = {**labels, 'pdo': number}
+            add('tpdo_frames_total', 'counter', pdo_labels, pdo['frames'])
+            add('tpdo_missed_sync_cycles_total', 'counter', pdo_labels, pdo['missed_sync_cycles'])
+            add_histogram('tpdo_inter_arrival_seconds', pdo_labels, pdo['inter_arrival'])
+            add_histogram('tpdo_callback_seconds', pdo_labels, pdo['callback_time'])
+        for number, count in motor['rpdo_transmits'].items():
+            add('rpdo_transmits_total', 'counter', {**labels, 'pdo': number}, count)
+        add_histogram('sdo_round_trip_seconds', labels, motor['sdo_round_trip'])
+        add('sdo_errors_total', 'counter', labels, motor['sdo_errors'])
+
+    # SYNC counts only grow, the worst lateness is a level
+    sync = snapshot['sync']
+    add('sync_cycles_total', 'counter', {}, sync['cycle'])
+    add('sync_late_cycles_total', 'counter', {}, sync['late_cycles'])
+    add('sync_missed_cycles_total', 'counter', {}, sync['missed_cycles'])
+    add('sync_callback_errors_total', 'counter', {}, sync['callback_errors'])
+    add('sync_max_lateness', 'gauge', {}, sync['max_lateness'])
+    add('state_incomplete_cycles_total', 'counter', {}, snapshot['incomplete_cycles'])
+    return '\n'.join(line for lines in families.values() for line in lines) + '\n'
@@ -0,0 +1,61 @@
+class MotorStatus:
+    """The raw CiA 402 statusword of a motor, its bits decoded only when read.
+
+    The receive thread stores one integer per statusword change instead of
+    rewriting every status bit. Reads keep the dict interface of the former
+    status dict, status['fault'] or status.get('statusword').
+    """
+    # Statusword bit of each status
+    BITS = {
+        'ready_to_switch_on': 0,
+        'switched_on':        1,
+        'operation_enabled':  2,
+        'fault':              3,
+        'voltage_enabled':    4,
+        'quick_stop':         5,
+        'switch_on_disabled': 6,
+        'warning':            7,
+    }
+
+    __slots__ = ('statusword',)
+
+    def __init__(self, statusword=None):
+        # None until the first statusword is received
+        self.statusword = statusword
+
+    def bit(self, name):
+        """Decode one status bit, False before the first statusword"""
+        statusword = self.statusword
+        return statusword is not None and bool(statusword & (1 << self.BITS[name]))
+
+    @property
+    def operation_enabled(self):
+        return self.bit('operation_enabled')
+
+    @property
+    def fault(self):
+        return self.bit('fault')
+
+    @property
+    def switch_on_disabled(self):
+        return self.bit('switch_on_disabled')
+
+    def __getitem__(self, key):
+        if key == 'statusword':
+            return self.statusword
+        return self.bit(key)
+
+    def __contains__(self, key):
+        return key == 'statusword' or key in self.BITS
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return ('statusword',) + tuple(self.BITS)
+
+    def to_dict(self):
+        return {key: self[key] for key in self.keys()}
+
+    def __repr__(self):
+        return f"MotorStatus({self.to_dict()})"
@@ -0,0 +1,109 @@
+import os
+import re
+import copy
+import pickle
+import hashlib
+import threading
+import canopen
+from canopen.objectdictionary import ODVariable
+
+class ObjectDictionaryCache:
+    """Parses every object dictionary file once and shares it between nodes.
+
+    Nodes loaded from the same file share all objects except the few whose
+    values are relative to the node ID ($NODEID), which get a per-node copy.
+    With cache_dir set, parsed dictionaries are also pickled to disk keyed by
+    the SHA-256 of the file, so a new process skips parsing altogether.
+    """
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self.templates = {}
+        self.lock = threading.Lock()
+
+    def get(self, file_path, node_id):
+        """Get the object dictionary of file_path for node_id"""
+        return self.copy_for_node(self.load_template(file_path), node_id)
+
+    def load_template(self, file_path):
+        file_path = os.path.abspath(file_path)
+        with self.lock:
+            template = self.templates.get(file_path)
+            if template is None:
+                template = self.read_template(file_path)
+                self.templates[file_path] = template
+        return template
+
+    def read_template(self, file_path):
+        if self.cache_dir is None:
+            return canopen.import_od(file_path)
+
+        # Key on content and canopen version, a pickle is only valid for the classes it was made with
+        with open(file_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        cache_file = os.path.join(
+            self.cache_dir, f"{os.path.basename(file_path)}.{digest}.{canopen.__version__}.pickle")
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'rb') as f:
+                    return pickle.load(f)
+            except Exception:
+                # Unreadable cache entry, parse again and overwrite it
+                pass
+
+        template = canopen.import_od(file_path)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'wb') as f:
+            pickle.dump(template, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+        return template
+
+    @staticmethod
+    def copy_for_node(template, node_id):
+        """Shallow copy of template with the node relative objects resolved for node_id"""
+        od = copy.copy(template)
+        od.indices = dict(template.indices)
+        od.names = dict(template.names)
+        od.node_id = node_id
+
+        for index, obj in template.indices.items():
+            if isinstance(obj, ODVariable):
+                if not is_node_relative(obj):
+                    continue
+                new_obj = resolve_variable(obj, node_id, od)
+            else:
+                relative_vars = [var for var in obj.subindices.values() if is_node_relative(var)]
+                if not relative_vars:
+                    continue
+                new_obj = copy.copy(obj)
+                new_obj.parent = od
+                new_obj.subindices = dict(obj.subindices)
+                new_obj.names = dict(obj.names)
+                for var in relative_vars:
+                    new_var = resolve_variable(var, node_id, new_obj)
+                    new_obj.subindices[var.subindex] = new_var
+                    new_obj.names[var.name] = new_var
+            od.indices[index] = new_obj
+            od.names[obj.name] = new_obj
+        return od
+
+def has_node_id(raw):
+    # Files spell it $NODEID or $NodeID
+    return raw is not None and '$NODEID' in raw.upper()
+
+def is_node_relative(var):
+    return has_node_id(getattr(var, 'default_raw', None)) or has_node_id(getattr(var, 'value_raw', None))
+
+def resolve_variable(var, node_id, parent):
+    new_var = copy.copy(var)
+    new_var.parent = parent
+    if has_node_id(getattr(var, 'default_raw', None)):
+        new_var.default = resolve_node_id(var.default_raw, node_id)
+    if has_node_id(getattr(var, 'value_raw', None)):
+        new_var.value = resolve_node_id(var.value_raw, node_id)
+    return new_var
+
+def resolve_node_id(raw, node_id):
+    # Same rule as the EDS importer, e.g. '$NODEID+0x180'
+    value = raw.replace(' ', '').upper()
+    return int(re.sub(r'\+?\$NODEID\+?', '', value), 0) + node_id
@@ -0,0 +1,48 @@
+from canopen import SdoAbortedError
+
+# COB-ID bits that are not part of the identifier
+PDO_NOT_VALID = 1 << 31
+
+def pdo_config(pdo_map):
+    """Communication and mapping parameters of a local PDO map that save() writes"""
+    return (
+        pdo_map.cob_id,
+        pdo_map.enabled,
+        pdo_map.trans_type,
+        pdo_map.inhibit_time,
+        pdo_map.event_timer,
+        tuple((var.index, var.subindex, var.length) for var in pdo_map.map),
+    )
+
+def read_pdo_config(pdo_map):
+    """Read the parameters pdo_config(pdo_map) covers from the drive, without touching pdo_map.
+
+    Optional parameters are only read when the local map sets them, so the
+    result compares equal to pdo_config(pdo_map) when the drive is up to date.
+    None if the drive aborts a read, so the PDO is saved.
+    """
+    def read_optional(subindex, wanted):
+        if wanted is None:
+            return None
+        try:
+            return pdo_map.com_record[subindex].raw
+        except (KeyError, SdoAbortedError):
+            return None
+
+    try:
+        cob_id = pdo_map.com_record[1].raw
+        trans_type = pdo_map.com_record[2].raw
+        mapping = []
+        for subindex in range(1, pdo_map.map_array[0].raw + 1):
+            value = pdo_map.map_array[subindex].raw
+            mapping.append((value >> 16, (value >> 8) & 0xFF, value & 0xFF))
+    except (KeyError, SdoAbortedError):
+        return None
+    return (
+        cob_id & 0x1FFFFFFF,
+        cob_id & PDO_NOT_VALID == 0,
+        trans_type,
+        read_optional(3, pdo_map.inhibit_time),
+        read_optional(5, pdo_map.event_timer),
+        tuple(mapping),
+    )
@@ -0,0 +1,24 @@
+import struct
+
+class PdoDecoder:
+    """Decodes every variable of a PDO map with one precompiled struct.
+
+    The layout is compiled once from the local PDO map, so decoding a frame is a
+    single unpack_from call on the received data without slicing it.
+    """
+    def __init__(self, pdo_map):
+        fmt = '<'
+        self.names = []
+        offset = 0
+        for var in pdo_map.map:
+            if var.offset % 8 or var.length % 8:
+                raise ValueError(f"{var.name} is not byte aligned in {pdo_map.name}")
+            fmt += 'x' * ((var.offset - offset) // 8)
+            fmt += var.od.STRUCT_TYPES[var.od.data_type].format.lstrip('<>')
+            self.names.append(var.name)
+            offset = var.offset + var.length
+        self.struct = struct.Struct(fmt)
+        self.size = self.struct.size
+
+        # decode(data) unpacks all mapped variables in map order
+        self.decode = self.struct.unpack_from
@@ -0,0 +1,104 @@
+# Bits in the data field of a classic CAN frame
+PDO_LENGTH = 64
+
+# Highest transmission type sent on every Nth SYNC
+MAX_SYNC_INTERVAL = 240
+
+class BusOverloadError(RuntimeError):
+    def __init__(self, bus_load, max_bus_load):
+        self.bus_load = bus_load
+        self.max_bus_load = max_bus_load
+        super().__init__(f"Predicted bus load {bus_load:.1%} exceeds {max_bus_load:.1%}")
+
+class PdoSignal:
+    """One object a PDO carries, wanted every sync_interval SYNCs"""
+    def __init__(self, name, length, sync_interval=1):
+        if not 1 <= sync_interval <= MAX_SYNC_INTERVAL:
+            raise ValueError(f"{name}: SYNC interval must be 1 to {MAX_SYNC_INTERVAL}, got {sync_interval}")
+        self.name = name
+        self.length = length
+        self.sync_interval = sync_interval
+
+    def __repr__(self):
+        return f"PdoSignal({self.name!r}, {self.length}, {self.sync_interval})"
+
+class PlannedPdo:
+    """Signals packed into one PDO, sent on every sync_interval SYNCs"""
+    def __init__(self, sync_interval):
+        self.sync_interval = sync_interval
+        self.signals = []
+
+    @property
+    def length(self):
+        return sum(signal.length for signal in self.signals)
+
+    @property
+    def trans_type(self):
+        # Synchronous transmission types 1 to 240 send on every Nth SYNC
+        return self.sync_interval
+
+    def fits(self, signal):
+        return self.sync_interval <= signal.sync_interval and self.length + signal.length <= PDO_LENGTH
+
+    def __repr__(self):
+        return f"PlannedPdo({self.sync_interval}, {[signal.name for signal in self.signals]})"
+
+def plan_pdos(signals, max_pdos=4):
+    """Pack signals into the fewest PDOs of PDO_LENGTH bits.
+
+    Signals of the same SYNC interval are packed first-fit by decreasing length.
+    If that needs more than max_pdos PDOs, the slowest PDOs are dissolved into
+    the spare room of faster ones, where their signals are sent more often than
+    asked for. ValueError if the signals do not fit into max_pdos PDOs at all.
+    """
+    pdos = []
+    for signal in sorted(signals, key=lambda signal: (signal.sync_interval, -signal.length)):
+        if signal.length > PDO_LENGTH:
+            raise ValueError(f"{signal.name} does not fit into a PDO")
+        pdo = next((pdo for pdo in pdos if pdo.sync_interval == signal.sync_interval and pdo.fits(signal)), None)
+        if pdo is None:
+            pdo = PlannedPdo(signal.sync_interval)
+            pdos.append(pdo)
+        pdo.signals.append(signal)
+
+    # Too many PDOs, move the signals of the slowest PDO into the slowest faster ones they fit
+    while len(pdos) > max_pdos:
+        slowest = max(pdos, key=lambda pdo: (pdo.sync_interval, -pdo.length))
+        pdos.remove(slowest)
+        for signal in sorted(slowest.signals, key=lambda signal: -signal.length):
+            pdo = max((pdo for pdo in pdos if pdo.fits(signal)), key=lambda pdo: pdo.sync_interval, default=None)
+            if pdo is None:
+                names = ', '.join(signal.name for signal in signals)
+                raise ValueError(f"{names} do not fit into {max_pdos} PDOs")
+            pdo.signals.append(signal)
+    return pdos
+
+def frame_bits(data_length):
+    """Worst-case bits on the bus of a CAN 2.0A data frame with data_length bytes,
+    including bit stuffing and the interframe space
+    """
+    return 47 + 8 * data_length + (34 + 8 * data_length - 1) // 4
+
+def pdo_frames(node):
+    """(data bytes, SYNC interval) of every enabled PDO of a node's local PDO maps.
+
+    Acyclic PDOs are counted once per SYNC, the rate a cyclic command stream
+    sends them at.
+    """
+    frames = []
+    for pdo_maps in (node.tpdo.map, node.rpdo.map):
+        for pdo_map in pdo_maps.values():
+            if not pdo_map.enabled or pdo_map.cob_id is None:
+                continue
+            length = sum(var.length for var in pdo_map.map)
+            trans_type = pdo_map.trans_type
+            sync_interval = trans_type if trans_type and trans_type <= MAX_SYNC_INTERVAL else 1
+            frames.append(((length + 7) // 8, sync_interval))
+    return frames
+
+def predict_bus_load(frames, sync_period, bitrate):
+    """Fraction of the bitrate used by (data bytes, SYNC interval) frames plus the SYNC itself"""
+    bits_per_sync = frame_bits(0)
+    for data_length, sync_interval in frames:
+        bits_per_sync += frame_bits(data_length) / sync_interval
+    return bits_per_sync / sync_period / bitrate
@@ -0,0 +1,56 @@
+import importlib
+
+# Entry point group other packages register their driver loaders in, e.g. in setup.py:
+# entry_points={'canopen_sdk.drivers': ['my_drive = my_package.loader:MyDriveLoader']}
+ENTRY_POINT_GROUP = 'canopen_sdk.drivers'
+
+# Built-in driver loaders by vendor_type, as 'module:attribute' imported on first use
+DRIVERS = {
+    'eRob': 'canopen_sdk.erob.erob_loader:EROBLoader',
+    'elmo': 'canopen_sdk.elmo.elmo_loader:ELMOLoader',
+}
+
+def register_driver(vendor_type, loader):
+    """Register a driver loader or its 'module:attribute'. A loader has load_motor(motor_config)
+    taking a MotorConfig, and optionally DEFAULTS, {field: value} for the motor config
+    """
+    DRIVERS[vendor_type] = loader
+
+def get_driver(vendor_type):
+    """Get the loader of vendor_type, importing its module only now"""
+    loader = DRIVERS.get(vendor_type)
+    if loader is None:
+        loader = _find_entry_point(vendor_type)
+    if loader is None:
+        raise ValueError(f"Unknown vendor type: {vendor_type}, expected one of {get_vendor_types()}")
+    if isinstance(loader, str):
+        module_name, _, attribute = loader.partition(':')
+        loader = getattr(importlib.import_module(module_name), attribute)
+        DRIVERS[vendor_type] = loader
+    return loader
+
+def get_vendor_types():
+    """Get the vendor types of the built-in, registered and installed drivers, without importing them"""
+    return sorted(set(DRIVERS) | {entry_point.name for entry_point in _entry_points()})
+
+def load_motor(motor_config):
+    """Create the motor of one MotorConfig with the driver of its vendor_type"""
+    return get_driver(motor_config.vendor_type).load_motor(motor_config)
+
+def _find_entry_point(vendor_type):
+    for entry_point in _entry_points():
+        if entry_point.name == vendor_type:
+            return entry_point.value
+    return None
+
+def _entry_points():
+    # Package metadata is only scanned for vendor types that are not built in
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return []
+    try:
+        return list(entry_points(group=ENTRY_POINT_GROUP))
+    except TypeError:
+        # Python < 3.10
+        return list(entry_points().get(ENTRY_POINT_GROUP, []))
@@ -2,13 +2,26 @@ import os
 from canopen_sdk.elmo import ELMO
 
 class ELMOLoader:
+    # Defaults of the motor config fields for ELMO drives
+    DEFAULTS = {}
+
     @staticmethod
     def load_motor(motor_config):
-        if not os.path.exists('canopen_sdk/elmo/elmo.dcf'):
-            raise FileNotFoundError(f"Object dictionary file not found: canopen_sdk/elmo/elmo.dcf")
-        
-        return ELMO(motor_config['node_id'], 'canopen_sdk/elmo/elmo.dcf',
-                    motor_config['zero_offset'], motor_config['operation_mode'],
-                    motor_config['profile_velocity'], motor_config['profile_acceleration'],
-                    motor_config['profile_deceleration'], motor_config['name'],
-                    motor_config['pulse_per_revolution'])
\ No newline at end of file
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        file_path = os.path.join(base_dir, 'elmo.dcf')
+
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Object dictionary file not found: {file_path}")
+
+        return ELMO(motor_config.node_id, file_path,
+                    name=motor_config.name,
+                    pulse_per_revolution=motor_config.pulse_per_revolution,
+                    zero_offset=motor_config.zero_offset,
+                    operation_mode=motor_config.operation_mode,
+                    profile_velocity=motor_config.profile_velocity,
+                    profile_acceleration=motor_config.profile_acceleration,
+                    profile_deceleration=motor_config.profile_deceleration,
+                    min_position_limit=motor_config.min_position_limit,
+                    max_position_limit=motor_config.max_position_limit,
+                    parameters=motor_config.parameters,
+                    tpdo_intervals=motor_config.tpdo_intervals)
@@ -1,103 +1,113 @@
+from canopen.lss import LssError
 from canopen_sdk.common import BaseMotorInterface
 
 PI = 3.141592653589793
 
 class ELMO(BaseMotorInterface):
+    TPDO_SIGNALS = {
+        'statusword': 'statusword',
+        'position': 'position_actual_value',
+        'velocity': 'velocity_actual_value',
+        'torque': 'torque_actual_value',
+    }
+
+    __slots__ = ('rated_torque', 'setpoint_handshake')
+
     def __init__(self, node_id, object_dictionary_file_path,
                  zero_offset=0, operation_mode='PROFILE_POSITION',
                  profile_velocity=1.0, profile_acceleration=1.0, profile_deceleration=1.0,
-                 name=None, pulse_per_revolution=1000):
-        super().__init__(node_id, object_dictionary_file_path, zero_offset, operation_mode,
-                         profile_velocity, profile_acceleration, profile_deceleration,
-                         name, pulse_per_revolution)
+                 name=None, pulse_per_revolution=1000, parameters=None, tpdo_intervals=None,
+                 min_position_limit=-1.0, max_position_limit=1.0):
+        super().__init__(node_id, object_dictionary_file_path,
+                         name=name, pulse_per_revolution=pulse_per_revolution,
+                         zero_offset=zero_offset, operation_mode=operation_mode,
+                         profile_velocity=profile_velocity, profile_acceleration=profile_acceleration,
+                         profile_deceleration=profile_deceleration,
+                         min_position_limit=min_position_limit, max_position_limit=max_position_limit,
+                         parameters=parameters, tpdo_intervals=tpdo_intervals)
         self.PulseToRad = (2 * PI) / self.pulse_per_revolution
         self.RadToPulse = self.pulse_per_revolution / (2 * PI)
         self.rated_torque = 1.0
+        self.setpoint_handshake = False
+
+    def get_parameters(self):
+        parameters = {
+            # Profile Velocity (pulse/s)
+            'profile_velocity': self.to_unsigned_int32(self.profile_velocity * self.RadToPulse),
+
+            # Profile Acceleration (pulse/s^2)
+            'profile_acceleration': self.to_unsigned_int32(self.profile_acceleration * self.RadToPulse),
+
+            # Profile Deceleration (pulse/s^2)
+            'profile_deceleration': self.to_unsigned_int32(self.profile_deceleration * self.RadToPulse),
+
+            # Linear Lamp
+            'motion_profile_type': 0,
+        }
+
+        # Parameters of the motor config come last and win
+        parameters.update(self.parameters)
+        return list(parameters.items())
 
     def initialize_motor(self):
         # Fault Reset
         self.node.sdo['controlword'].raw = 0x80
-        self.pause_for_seconds(0.1)
+        self.wait_for_fault_cleared()
 
         # Operation Mode
         self.node.sdo['modes_of_operation'].raw = self.OPERATION_MODES[self.operation_mode]
-        self.pause_for_seconds(0.1)
-
-        # Profile Velocity (pulse/s)
-        self.node.sdo['profile_velocity'].raw = self.to_unsigned_int32(
-            self.profile_velocity * self.RadToPulse)
-        self.pause_for_seconds(0.1)
-
-        # Profile Acceleration (pulse/s^2)
-        self.node.sdo['profile_acceleration'].raw = self.to_unsigned_int32(
-            self.profile_acceleration * self.RadToPulse)
-        self.pause_for_seconds(0.1)
+        self.wait_for_operation_mode()
 
-        # Profile Deceleration (pulse/s^2)
-        self.node.sdo['profile_deceleration'].raw = self.to_unsigned_int32(
-            self.profile_deceleration * self.RadToPulse)
-        self.pause_for_seconds(0.1)
+        # Profile parameters
+        self.apply_parameters(self.get_parameters())
 
-        # Linear Lamp
-        self.node.sdo['motion_profile_type'].raw = 0
-        self.pause_for_seconds(0.1)
+        # Linear interpolation, clear and enable the interpolation buffer
+        if self.is_interpolated_mode():
+            self.node.sdo['interpolation_sub_mode_select'].raw = 0
+            self.node.sdo['interpolation_data_configuration']['interpolation_data_configuration_buffer_clear'].raw = 0
+            self.node.sdo['interpolation_data_configuration']['interpolation_data_configuration_buffer_clear'].raw = 1
 
         # Shutdown
         self.node.sdo['controlword'].raw = 0x06
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('READY_TO_SWITCH_ON')
 
         # Switch On
         self.node.sdo['controlword'].raw = 0x07
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('SWITCHED_ON')
 
         # Enable Operation
         self.node.sdo['controlword'].raw = 0x0F
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('OPERATION_ENABLED')
 
     def reset_motor(self):
         # Fault Reset
         self.node.sdo['controlword'].raw = 0x80
-        self.pause_for_seconds(0.1)
+        self.wait_for_fault_cleared()
 
         # Shutdown
         self.node.sdo['controlword'].raw = 0x06
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('READY_TO_SWITCH_ON')
 
         # Switch On
         self.node.sdo['controlword'].raw = 0x07
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('SWITCHED_ON')
 
         # Enable Operation
         self.node.sdo['controlword'].raw = 0x0F
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('OPERATION_ENABLED')
 
-    def setup_pdo_mapping(self):
-        # Read PDO setting
-        self.node.tpdo.read()
-        self.node.rpdo.read()
-
-        # TPDO 1 mapping (motor -> controller)
-        self.node.tpdo[1].clear()
-        self.node.tpdo[1].add_variable('statusword')
-        self.node.tpdo[1].add_variable('position_actual_value')
-        self.node.tpdo[1].cob_id = 0x180 + self.node_id
-        self.node.tpdo[1].trans_type = 1
-        self.node.tpdo[1].event_timer = 0
-        self.node.tpdo[1].enabled = True
-        
-        # TPDO 2 mapping
-        self.node.tpdo[2].clear()
-        self.node.tpdo[2].add_variable('torque_actual_value')
-        self.node.tpdo[2].add_variable('velocity_actual_value')
-        self.node.tpdo[2].cob_id = 0x280 + self.node_id
-        self.node.tpdo[2].trans_type = 1
-        self.node.tpdo[2].event_timer = 0
-        self.node.tpdo[2].enabled = True
+    def build_pdo_mapping(self):
+        # TPDO mapping (motor -> controller), packed by the planner
+        self.build_tpdo_mapping()
 
         # RPDO 1 mapping (controller -> motor)
         self.node.rpdo[1].clear()
         self.node.rpdo[1].add_variable('controlword')
-        self.node.rpdo[1].add_variable('target_position')
+        if self.is_interpolated_mode():
+            self.target_position_pdo = self.node.rpdo[1].add_variable(
+                'interpolation_data_record', 'interpolation_data_record_setpoint_1')
+        else:
+            self.target_position_pdo = self.node.rpdo[1].add_variable('target_position')
         self.node.rpdo[1].cob_id = 0x200 + self.node_id
         self.node.rpdo[1].trans_type = 0
         self.node.rpdo[1].enabled = True
@@ -109,110 +119,143 @@ class ELMO(BaseMotorInterface):
         self.node.rpdo[2].trans_type = 0
         self.node.rpdo[2].enabled = True
 
-        # Saves and Applies PDO setting
-        self.node.nmt.state = 'PRE-OPERATIONAL'
-        self.node.tpdo.save()
-        self.node.rpdo.save()
-        self.node.nmt.state = 'OPERATIONAL'
-
-        # Read Motor Rated Current (mA)
-        self.motor_rated_current = self.node.sdo['motor_rated_current'].raw
-        self.pause_for_seconds(0.1)
+    def setup_pdo_mapping(self):
+        self.build_pdo_mapping()
 
-    def add_pdo_callback(self):
-        # Add TPDO 1 callback
-        self.network.subscribe(self.node.tpdo[1].cob_id, self.node.tpdo[1].on_message)
-        self.node.tpdo[1].add_callback(self.tpdo_1_callback)
+        # Saves and Applies the PDOs that differ from the drive
+        self.apply_pdo_mapping()
 
-        # Add TPDO 2 callback
-        self.network.subscribe(self.node.tpdo[2].cob_id, self.node.tpdo[2].on_message)
-        self.node.tpdo[2].add_callback(self.tpdo_2_callback)
+        # Read Motor Rated Current (mA), it does not change while the drive is up
+        if not self.motor_rated_current:
+            self.motor_rated_current = self.node.sdo['motor_rated_current'].raw
 
-    def tpdo_1_callback(self, message):
-        # Read Status word
-        current_statusword = int.from_bytes(message.data[0:2], byteorder='little', signed=False)
-        
-        # Compare current and previous status word and update motor status
-        previous_statusword = self.motor_status.get('statusword', None)
-        if previous_statusword is None or previous_statusword != current_statusword:
-            self.motor_status['statusword'] = current_statusword
-            self.motor_status['ready_to_switch_on'] = bool(current_statusword & (1 << 0))
-            self.motor_status['switched_on'] = bool(current_statusword & (1 << 1))
-            self.motor_status['operation_enabled'] = bool(current_statusword & (1 << 2))
-            self.motor_status['fault'] = bool(current_statusword & (1 << 3))
-            self.motor_status['voltage_enabled'] = bool(current_statusword & (1 << 4))
-            self.motor_status['quick_stop'] = bool(current_statusword & (1 << 5))
-            self.motor_status['switch_on_disabled'] = bool(current_statusword & (1 << 6))
-            self.motor_status['warning'] = bool(current_statusword & (1 << 7))
-            
+    def add_pdo_callback(self):
+        # Add TPDO callbacks
+        self.add_tpdo_callbacks()
+
+    def on_statusword(self, current_statusword, timestamp):
+        # Store the raw statusword on a change, its bits are decoded when read
+        status = self.motor_status
+        previous_statusword = status.statusword
+        if previous_statusword != current_statusword:
+            status.statusword = current_statusword
+            self.notify_statusword(previous_statusword)
+        self.state[self.statusword_slot] = current_statusword
+
+        # New set-point handshake, release bit 4 once the drive acknowledges the set-point
+        if self.setpoint_handshake and current_statusword & (1 << 12):
+            with self.command_lock:
+                if self.setpoint_handshake:
+                    self.node.rpdo[1]['controlword'].raw = 0x0F
+                    self.node.rpdo[1].transmit()
+                    self.setpoint_handshake = False
+        elif (self.position_staged and self.operation_mode == 'PROFILE_POSITION'
+              and not current_statusword & (1 << 12)):
+            self.transmit_command()
+
+    def on_position(self, position, timestamp):
         # Read position
-        position = int.from_bytes(message.data[2:6], byteorder='little', signed=True)
-        self.current_position = (position - self.zero_offset) * self.PulseToRad
-        
+        state = self.state
+        state[self.position_slot] = (position - self.zero_offset) * self.PulseToRad
+        state[self.timestamp_slot] = timestamp
+
         # Write to logger
-        self.logger.write_key_values({
-            'position': self.current_position,
-            'torque': self.current_torque,
-            'velocity': self.current_velocity,
-            'acceleration': self.current_acceleration,
-            'statusword': self.motor_status['statusword'],
-            'ready_to_switch_on': self.motor_status['ready_to_switch_on'],
-            'switched_on': self.motor_status['switched_on'],
-            'operation_enabled': self.motor_status['operation_enabled'],
-            'fault': self.motor_status['fault'],
-            'voltage_enabled': self.motor_status['voltage_enabled'],
-            'quick_stop': self.motor_status['quick_stop'],
-            'switch_on_disabled': self.motor_status['switch_on_disabled'],
-            'warning': self.motor_status['warning']
-        })
-
-    def tpdo_2_callback(self, message):
-        # Read Torque
-        torque = int.from_bytes(message.data[0:2], byteorder='little', signed=True)
-        self.current_torque = torque / 1000 * self.motor_rated_current
+        logger = self.logger
+        if logger is not None:
+            logger.write((timestamp, state[self.position_slot], state[self.velocity_slot],
+                          state[self.acceleration_slot], state[self.torque_slot],
+                          int(state[self.statusword_slot])))
 
+    def on_velocity(self, velocity, timestamp):
         # Read Velocity
-        velocity = int.from_bytes(message.data[2:6], byteorder='little', signed=True)
-        self.current_velocity = velocity * self.PulseToRad
-
-        # Compute Acceleration
-        self.current_acceleration = (self.current_velocity - self.previous_velocity) / self.dt
-        self.previous_velocity = self.current_velocity
+        velocity = velocity * self.PulseToRad
+        self.state[self.velocity_slot] = velocity
+
+        # Compute Acceleration over the SYNC periods since the previous velocity,
+        # so a dropped frame is not read as a jump and a repeated frame is skipped
+        period = self.dt * self.velocity_interval
+        periods = 1
+        if self.previous_velocity_timestamp:
+            periods = round((timestamp - self.previous_velocity_timestamp) / period)
+        if periods > 0:
+            self.state[self.acceleration_slot] = (velocity - self.previous_velocity) / (periods * period)
+            self.previous_velocity = velocity
+            self.previous_velocity_timestamp = timestamp
+
+    def on_torque(self, torque, timestamp):
+        # Read Torque
+        self.state[self.torque_slot] = torque / 1000 * self.motor_rated_current
         
     def command_switch_on(self):
+        self.setpoint_handshake = False
+        self.release_commands()
+
         # Shutdown
         self.node.sdo['controlword'].raw = 0x06
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('READY_TO_SWITCH_ON')
 
         # Switch On
         self.node.sdo['controlword'].raw = 0x07
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('SWITCHED_ON')
 
         # Enable Operation
         self.node.sdo['controlword'].raw = 0x0F
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('OPERATION_ENABLED')
 
     def command_quick_stop(self):
         # Quick Stop
         self.node.sdo['controlword'].raw = 0x02
         self.pause_for_seconds(0.1)
-        
-        self.logger.close()
 
-    def set_position(self, value):
+    def transmit_quick_stop(self):
+        # Quick Stop, latched on the next SYNC
+        with self.command_lock:
+            self.node.rpdo[1]['controlword'].raw = 0x02
+            self.node.rpdo[1].transmit()
+            self.position_staged = False
+            self.torque_staged = False
+            self.setpoint_handshake = False
+            self.commands_inhibited = True
+
+    def stage_position(self, value):
         # Write Target Position
         position = value * self.RadToPulse + self.zero_offset
-        self.node.rpdo[1]['target_position'].raw = self.to_signed_int32(position)
-    
-        # Enable Operation
-        self.node.rpdo[1]['controlword'].raw = 0x0F
-        self.node.rpdo[1].transmit()
-        self.pause_for_seconds(0.01)
-
-        # New Set-point
-        self.node.rpdo[1]['controlword'].raw = 0x3F
-        self.node.rpdo[1].transmit()
-        self.pause_for_seconds(0.01)
+        with self.command_lock:
+            self.target_position_pdo.raw = self.to_signed_int32(position)
+            self.position_staged = True
+
+    def stage_torque(self, value):
+        # Write Target Torque
+        torque = (value * 1000) / self.motor_rated_current
+        with self.command_lock:
+            self.node.rpdo[2]['target_torque'].raw = self.to_signed_int16(torque)
+            self.torque_staged = True
+
+    def transmit_command(self):
+        with self.command_lock:
+            if self.commands_inhibited:
+                self.position_staged = False
+                self.torque_staged = False
+                return
+            if self.position_staged and self.operation_mode != 'PROFILE_POSITION':
+                # Enable Operation (and enable ip mode)
+                self.node.rpdo[1]['controlword'].raw = 0x1F if self.is_interpolated_mode() else 0x0F
+                self.node.rpdo[1].transmit()
+                self.position_staged = False
+            elif self.position_staged and not self.setpoint_handshake:
+                # New Set-point, a set-point staged during the handshake is sent by tpdo_1_callback
+                self.node.rpdo[1]['controlword'].raw = 0x3F
+                self.node.rpdo[1].transmit()
+                self.position_staged = False
+                self.setpoint_handshake = True
+
+            if self.torque_staged:
+                self.node.rpdo[2].transmit()
+                self.torque_staged = False
+
+    def set_position(self, value):
+        self.stage_position(value)
+        self.transmit_command()
         
     def set_velocity(self, value):
         """
@@ -227,21 +270,22 @@ class ELMO(BaseMotorInterface):
         pass
 
     def set_torque(self, value):
-        # Write Target Torque
-        torque = (value * 1000) / self.motor_rated_current
-        self.node.rpdo[2]['target_torque'].raw = self.to_signed_int16(torque)
-
-        # Enable Operation
-        self.node.rpdo[2]['controlword'].raw = 0x0F
-        self.node.rpdo[2].transmit()
-        self.pause_for_seconds(0.01)
-
-        # New Set-point
-        self.node.rpdo[2]['controlword'].raw = 0x3F 
-        self.node.rpdo[2].transmit()
-        self.pause_for_seconds(0.01)
-
-    def get_error_code(self):
-        # Error Code
-        error_code = self.node.sdo['error_code'].raw
-        return error_code
+        self.stage_torque(value)
+        self.transmit_command()
+
+    def reset_node_id(self, node_id):
+        # Select this drive over LSS by its identity object (vendor, product, revision, serial)
+        identity = self.node.sdo[0x1018]
+        lss_address = [identity[subindex].raw for subindex in range(1, 5)]
+        lss = self.network.lss
+        try:
+            selected = lss.send_switch_state_selective(*lss_address)
+        except LssError as e:
+            raise RuntimeError(f"{self.name}: no LSS response from node {self.node_id}") from e
+        if not selected:
+            raise RuntimeError(f"{self.name}: unexpected LSS response from node {self.node_id}")
+
+        # Configure and store the node ID, it takes effect on the next NMT reset
+        lss.configure_node_id(node_id)
+        lss.store_configuration()
+        lss.send_switch_state_global(lss.WAITING_STATE)
@@ -2,6 +2,11 @@ import os
 from canopen_sdk.erob import EROB
 
 class EROBLoader:
+    # Defaults of the motor config fields for eRob drives, 19-bit encoder
+    DEFAULTS = {
+        'pulse_per_revolution': 524288,
+    }
+
     @staticmethod
     def load_motor(motor_config):
         base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -10,10 +15,15 @@ class EROBLoader:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Object dictionary file not found: {file_path}")
 
-        return EROB(motor_config['node_id'], file_path,
-                    motor_config['name'], motor_config['pulse_per_revolution'],
-                    motor_config['zero_offset'], motor_config['operation_mode'],
-                    motor_config['profile_velocity'], motor_config['profile_acceleration'],
-                    motor_config['profile_deceleration'],
-                    motor_config['min_position_limit'], motor_config['max_position_limit'])
-
+        return EROB(motor_config.node_id, file_path,
+                    name=motor_config.name,
+                    pulse_per_revolution=motor_config.pulse_per_revolution,
+                    zero_offset=motor_config.zero_offset,
+                    operation_mode=motor_config.operation_mode,
+                    profile_velocity=motor_config.profile_velocity,
+                    profile_acceleration=motor_config.profile_acceleration,
+                    profile_deceleration=motor_config.profile_deceleration,
+                    min_position_limit=motor_config.min_position_limit,
+                    max_position_limit=motor_config.max_position_limit,
+                    parameters=motor_config.parameters,
+                    tpdo_intervals=motor_config.tpdo_intervals)
@@ -1,185 +1,233 @@
-import time
 from canopen_sdk.common import BaseMotorInterface
 
 PI = 3.141592653589793
 
 class EROB(BaseMotorInterface):
+    TPDO_SIGNALS = {
+        'statusword': 'Statusword',
+        'position': 'Position actual value',
+        'velocity': 'Velocity actual value',
+        'torque': 'Torque actual value',
+    }
+
+    __slots__ = ('error_message', 'motor_constant')
+
     def __init__(self, node_id, object_dictionary_file_path, 
                  name=None, pulse_per_revolution=1000, zero_offset=0, operation_mode='PROFILE_POSITION',
                  profile_velocity=1.0, profile_acceleration=1.0, profile_deceleration=1.0,
-                 min_position_limit=-1.0, max_position_limit=1.0):
+                 min_position_limit=-1.0, max_position_limit=1.0, parameters=None, tpdo_intervals=None):
         super().__init__(node_id, object_dictionary_file_path, 
                          name, pulse_per_revolution, 
                          zero_offset, operation_mode,
                          profile_velocity, profile_acceleration, profile_deceleration,
-                         min_position_limit, max_position_limit)
+                         min_position_limit, max_position_limit, parameters, tpdo_intervals)
         self.PulseToRad = (2 * PI) / self.pulse_per_revolution
         self.RadToPulse = self.pulse_per_revolution / (2 * PI)
         self.error_message = {}
     
-    def initialize_motor(self):
-        # Linear Lamp
-        self.node.sdo['Motion profile type'].raw = 0x00
-        self.pause_for_seconds(0.1)
+    def get_parameters(self):
+        parameters = {
+            # Profile Velocity (pulse/s)
+            'Profile velocity': self.to_unsigned_int32(self.profile_velocity * self.RadToPulse),
 
-        # Set Position range limit
-        self.node.sdo['Software position limit'][1].raw = self.to_signed_int32(
-            self.min_position_limit * self.RadToPulse
-        )
-        self.pause_for_seconds(0.1)
-        
-        self.node.sdo['Software position limit'][2].raw = self.to_signed_int32(
-            self.max_position_limit * self.RadToPulse
-        )
-        self.pause_for_seconds(0.1)
+            # Profile Acceleration (pulse/s^2)
+            'Profile acceleration': self.to_unsigned_int32(self.profile_acceleration * self.RadToPulse),
 
-        # Read Motor Rated Current (mA)
-        self.motor_rated_current = self.node.sdo['Motor rated current'].raw
-        self.pause_for_seconds(0.1)
+            # Profile Deceleration (pulse/s^2)
+            'Profile deceleration': self.to_unsigned_int32(self.profile_deceleration * self.RadToPulse),
+
+            # COB-ID SYNC message
+            'COB-ID SYNC message': 0x80,
+
+            # Communication cycle period
+            'Communication Cycle Period': 0x3E8,
+
+            # Linear Lamp
+            'Motion profile type': 0x00,
+
+            # Position range limit
+            (0x607D, 1): self.to_signed_int32(self.min_position_limit * self.RadToPulse),
+            (0x607D, 2): self.to_signed_int32(self.max_position_limit * self.RadToPulse),
+        }
+
+        # Parameters of the motor config come last and win
+        parameters.update(self.parameters)
+        return list(parameters.items())
+
+    def initialize_motor(self):
+        # Read Motor Rated Current (mA), it does not change while the drive is up
+        if not self.motor_rated_current:
+            self.motor_rated_current = self.node.sdo['Motor rated current'].raw
         
         # Motor Constant
         self.motor_constant = 294 / self.motor_rated_current
         
         self.start_position = self.node.sdo['Position actual value'].raw
-        self.pause_for_seconds(0.1)
 
     def reset_motor(self):
+        # Linear interpolation
+        if self.is_interpolated_mode():
+            self.node.sdo['Interpolation sub mode select'].raw = 0
+
         # Operation Mode
         self.node.sdo['Modes of operation'].raw = self.OPERATION_MODES[self.operation_mode]
-        self.pause_for_seconds(0.1)
         
         # Modes of operation display
-        self.node.sdo['Modes of operation display'].raw
-        
-        # Profile Velocity (pulse/s)
-        self.node.sdo['Profile velocity'].raw = self.to_unsigned_int32(
-            self.profile_velocity * self.RadToPulse)
-        self.pause_for_seconds(0.1)
-
-        # Profile Acceleration (pulse/s^2)
-        self.node.sdo['Profile acceleration'].raw = self.to_unsigned_int32(
-            self.profile_acceleration * self.RadToPulse)
-        self.pause_for_seconds(0.1)
-
-        # Profile Deceleration (pulse/s^2)
-        self.node.sdo['Profile deceleration'].raw = self.to_unsigned_int32(
-            self.profile_deceleration * self.RadToPulse)
-        self.pause_for_seconds(0.1)
-        
-        # COB-ID SYNC message
-        self.node.sdo['COB-ID SYNC message'].raw = 0x80
-        self.pause_for_seconds(0.1)
-        
-        # Communication cycle period
-        self.node.sdo['Communication Cycle Period'].raw = 0x3E8
-        self.pause_for_seconds(0.1)
+        self.wait_for_operation_mode()
         
-    def setup_pdo_mapping(self):
-        # TPDO 1 mapping (motor -> controller)
-        self.node.tpdo[1].clear()
-        self.node.tpdo[1].add_variable('Statusword')
-        self.node.tpdo[1].add_variable('Position actual value')
-        self.node.tpdo[1].cob_id = 0x180 + self.node_id
-        self.node.tpdo[1].trans_type = 1
-        self.node.tpdo[1].event_timer = 0
-        self.node.tpdo[1].enabled = True
+        # Profile, limit and SYNC parameters
+        self.apply_parameters(self.get_parameters())
         
-        # TPDO 2 mapping
-        self.node.tpdo[2].clear()
-        self.node.tpdo[2].add_variable('Velocity actual value')
-        self.node.tpdo[2].add_variable('Torque actual value')
-        self.node.tpdo[2].cob_id = 0x280 + self.node_id
-        self.node.tpdo[2].trans_type = 1
-        self.node.tpdo[2].event_timer = 0
-        self.node.tpdo[2].enabled = True
+    def build_pdo_mapping(self):
+        # TPDO mapping (motor -> controller), packed by the planner
+        self.build_tpdo_mapping()
         
         # RPDO 1 mapping (controller -> motor)
         self.node.rpdo[1].clear()
         self.node.rpdo[1].add_variable('Controlword')
-        self.node.rpdo[1].add_variable('Target Position')
+        if self.is_interpolated_mode():
+            self.target_position_pdo = self.node.rpdo[1].add_variable(
+                'Interpolation data record', 'Parameter1 of ip function')
+        else:
+            self.target_position_pdo = self.node.rpdo[1].add_variable('Target Position')
         self.node.rpdo[1].cob_id = 0x200 + self.node_id
-        self.node.rpdo[1].trans_type = 255
+        self.node.rpdo[1].trans_type = 1 if self.is_cyclic_mode() else 255
         self.node.rpdo[1].enabled = True
+
+        # RPDO 2 mapping
+        self.node.rpdo[2].clear()
+        self.node.rpdo[2].add_variable('Controlword')
+        self.node.rpdo[2].add_variable('Target torque')
+        self.node.rpdo[2].cob_id = 0x300 + self.node_id
+        self.node.rpdo[2].trans_type = 1 if self.is_cyclic_mode() else 255
+        self.node.rpdo[2].enabled = True
         
-        self.node.nmt.state = 'PRE-OPERATIONAL'
-        self.node.tpdo.save()
-        self.node.rpdo.save()
-        self.node.nmt.state = 'OPERATIONAL'
+    def setup_pdo_mapping(self):
+        self.build_pdo_mapping()
+
+        # Saves and Applies the PDOs that differ from the drive
+        self.apply_pdo_mapping()
         
     def add_pdo_callback(self):
-        # Add TPDO 1 callback
-        self.network.subscribe(self.node.tpdo[1].cob_id, self.node.tpdo[1].on_message)
-        self.node.tpdo[1].add_callback(self.tpdo_1_callback)
+        # Add TPDO callbacks
+        self.add_tpdo_callbacks()
 
-        # Add TPDO 2 callback
-        self.network.subscribe(self.node.tpdo[2].cob_id, self.node.tpdo[2].on_message)
-        self.node.tpdo[2].add_callback(self.tpdo_2_callback)
-        
-        # Add TPDO 3 callback
-        #self.network.subscribe(self.node.tpdo[3].cob_id, self.node.tpdo[3].on_message)
-        #self.node.tpdo[3].add_callback(self.tpdo_3_callback)
-        
-    def tpdo_1_callback(self, message):
-        # Read Statusword
-        current_statusword = int.from_bytes(message.data[0:2], byteorder='little', signed=False)
-        
-        # Compare current and previous status word and update motor status
-        previous_statusword = self.motor_status.get('statusword', None)
-        if previous_statusword is None or previous_statusword != current_statusword:
-            self.motor_status['statusword'] = current_statusword
-            #self.motor_status['ready_to_switch_on'] = bool(current_statusword & (1 << 0))
-            #self.motor_status['switched_on'] = bool(current_statusword & (1 << 1))
-            self.motor_status['operation_enabled'] = bool(current_statusword & (1 << 2))
-            self.motor_status['fault'] = bool(current_statusword & (1 << 3))
-            self.motor_status['voltage_enabled'] = bool(current_statusword & (1 << 4))
-            #self.motor_status['quick_stop'] = bool(current_statusword & (1 << 5))
-            self.motor_status['switch_on_disabled'] = bool(current_statusword & (1 << 6))
-            #self.motor_status['warning'] = bool(current_statusword & (1 << 7))
+    def on_statusword(self, current_statusword, timestamp):
+        # Store the raw statusword on a change, its bits are decoded when read
+        status = self.motor_status
+        previous_statusword = status.statusword
+        if previous_statusword != current_statusword:
+            status.statusword = current_statusword
+            self.notify_statusword(previous_statusword)
+        self.state[self.statusword_slot] = current_statusword
 
+    def on_position(self, position, timestamp):
         # Read position
-        position = int.from_bytes(message.data[2:6], byteorder='little', signed=True)
-        self.current_position = (position - self.zero_offset) * self.PulseToRad
+        state = self.state
+        state[self.position_slot] = (position - self.zero_offset) * self.PulseToRad
+        state[self.timestamp_slot] = timestamp
+
+        # Write to logger
+        logger = self.logger
+        if logger is not None:
+            logger.write((timestamp, state[self.position_slot], state[self.velocity_slot],
+                          state[self.acceleration_slot], state[self.torque_slot],
+                          int(state[self.statusword_slot])))
     
-    def tpdo_2_callback(self, message):
+    def on_velocity(self, velocity, timestamp):
         # Read Velocity
-        velocity = int.from_bytes(message.data[0:4], byteorder='little', signed=True)
-        self.current_velocity = velocity * self.PulseToRad
-        
-        # Compute Acceleration
-        self.current_acceleration = (self.current_velocity - self.previous_velocity) / self.dt
-        self.previous_velocity = self.current_velocity
-        
+        velocity = velocity * self.PulseToRad
+        self.state[self.velocity_slot] = velocity
+        
+        # Compute Acceleration over the SYNC periods since the previous velocity,
+        # so a dropped frame is not read as a jump and a repeated frame is skipped
+        period = self.dt * self.velocity_interval
+        periods = 1
+        if self.previous_velocity_timestamp:
+            periods = round((timestamp - self.previous_velocity_timestamp) / period)
+        if periods > 0:
+            self.state[self.acceleration_slot] = (velocity - self.previous_velocity) / (periods * period)
+            self.previous_velocity = velocity
+            self.previous_velocity_timestamp = timestamp
+
+    def on_torque(self, torque, timestamp):
         # Read Torque
-        torque = int.from_bytes(message.data[4:6], byteorder='little', signed=True)
-        self.current_torque = torque / 1000 * 294
+        self.state[self.torque_slot] = torque / 1000 * 294
        
     def command_switch_on(self):
+        self.release_commands()
+
+        # Shutdown
         self.node.rpdo[1]['Controlword'].raw = 0x26
-        self.node.rpdo[1]['Target Position'].raw = self.start_position
+        self.target_position_pdo.raw = self.start_position
         self.node.rpdo[1].transmit()
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('READY_TO_SWITCH_ON')
         
+        # Switch On
         self.node.rpdo[1]['Controlword'].raw = 0x27
-        self.node.rpdo[1]['Target Position'].raw = self.start_position
+        self.target_position_pdo.raw = self.start_position
         self.node.rpdo[1].transmit()
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('SWITCHED_ON')
         
+        # Enable Operation
         self.node.rpdo[1]['Controlword'].raw = 0x2F
-        self.node.rpdo[1]['Target Position'].raw = self.start_position
+        self.target_position_pdo.raw = self.start_position
         self.node.rpdo[1].transmit()
-        self.pause_for_seconds(0.1)
+        self.wait_for_state('OPERATION_ENABLED')
         
     def command_quick_stop(self):
-        self.node.rpdo[1]['Controlword'].raw = 0x02
-        self.node.rpdo[1].transmit()
+        self.transmit_quick_stop()
         self.pause_for_seconds(0.1)
+
+    def transmit_quick_stop(self):
+        with self.command_lock:
+            self.node.rpdo[1]['Controlword'].raw = 0x02
+            self.node.rpdo[1].transmit()
+            self.position_staged = False
+            self.torque_staged = False
+            self.commands_inhibited = True
     
-    def set_position(self, value):
+    def stage_position(self, value):
         position = value * self.RadToPulse + self.zero_offset
-        self.node.rpdo[1]['Target Position'].raw = self.to_signed_int32(position)
-        self.node.rpdo[1]['Controlword'].raw = 0x103F # I don't understand why it works...
-        self.node.rpdo[1].transmit()
-        time.sleep(0.01)
+        with self.command_lock:
+            self.target_position_pdo.raw = self.to_signed_int32(position)
+            if self.is_interpolated_mode():
+                self.node.rpdo[1]['Controlword'].raw = 0x1F
+            elif self.is_cyclic_mode():
+                self.node.rpdo[1]['Controlword'].raw = 0x0F
+            else:
+                self.node.rpdo[1]['Controlword'].raw = 0x103F # I don't understand why it works...
+            self.position_staged = True
+
+    def stage_torque(self, value):
+        # Write Target Torque
+        torque = value * 1000 / self.motor_rated_current
+        with self.command_lock:
+            self.node.rpdo[2]['Target torque'].raw = self.to_signed_int16(torque)
+
+            # New set-point & Change set immediately
+            if self.is_cyclic_mode():
+                self.node.rpdo[2]['Controlword'].raw = 0x0F
+            else:
+                self.node.rpdo[2]['Controlword'].raw = 0x103F # I don't understand why it works...
+            self.torque_staged = True
+
+    def transmit_command(self):
+        with self.command_lock:
+            if self.commands_inhibited:
+                self.position_staged = False
+                self.torque_staged = False
+                return
+            if self.position_staged:
+                self.node.rpdo[1].transmit()
+                self.position_staged = False
+            if self.torque_staged:
+                self.node.rpdo[2].transmit()
+                self.torque_staged = False
+
+    def set_position(self, value):
+        self.stage_position(value)
+        self.transmit_command()
         
     def set_velocity(self, value):
         """
@@ -194,15 +242,8 @@ class EROB(BaseMotorInterface):
         pass
 
     def set_torque(self, value):
-        # Write Target Torque
-        torque = value * 1000 / self.motor_rated_current
-        self.node.rpdo[2]['Target torque'].raw = self.to_signed_int16(torque)
- 
-        # New set-point & Change set immediately
-        self.node.rpdo[2]['Controlword'].raw = 0x103F # I don't understand why it works...
-        self.node.rpdo[2].transmit()
-        #self.pause_for_seconds(0.05)
-        time.sleep(0.02)
+        self.stage_torque(value)
+        self.transmit_command()
 
     def reset_node_id(self, node_id):
         self.node.sdo[0x100B].raw = node_id
@@ -1,6 +1,10 @@
 import os
 import sys
+import time
+import struct
 import datetime
+import threading
+import collections
 
 class Logger:
     def __init__(self, filename):
@@ -37,3 +41,110 @@ class Logger:
 
     def close(self):
         self.file.close()
+
+class AsyncLogger:
+    """Logger for the receive thread, the file is written by a background thread.
+
+    The schema is fixed by keys. write() only appends a tuple of values to a
+    queue; the writer thread drains it in batches every flush_interval seconds as
+    CSV, or as packed little-endian doubles for file_format='binary'. Files are
+    rotated after max_bytes bytes or max_seconds seconds.
+    """
+    FORMATS = ('csv', 'binary')
+    BINARY_MAGIC = b'CSDKLOG1'
+
+    def __init__(self, filename, keys, file_format='csv', max_bytes=None, max_seconds=None,
+                 flush_interval=0.1, max_queue_length=100000):
+        if file_format not in self.FORMATS:
+            raise ValueError(f"Unknown log format: {file_format}, expected one of {self.FORMATS}")
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+        self.filename = filename
+        self.keys = tuple(keys)
+        self.file_format = file_format
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.flush_interval = flush_interval
+        self.max_queue_length = max_queue_length
+        self.record = struct.Struct('<' + 'd' * len(self.keys))
+        self.queue = collections.deque()
+        self.dropped_records = 0
+        self.file = None
+        self.closed = False
+        self.file_index = 0
+        self.file_bytes = 0
+        self.file_opened_at = 0.0
+        self.open_file()
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='canopen-sdk-logger', daemon=True)
+        self._thread.start()
+
+    def write(self, values):
+        """Queue one record, a tuple of values in the order of keys.
+        Records written after close() are dropped.
+        """
+        if self.closed:
+            return
+        if len(self.queue) >= self.max_queue_length:
+            self.dropped_records += 1
+            return
+        self.queue.append(values)
+
+    def write_key_values(self, key_values):
+        """Queue one record given as a dict, keys outside the schema are ignored"""
+        self.write(tuple(key_values.get(key) for key in self.keys))
+
+    def open_file(self):
+        if self.file_index == 0:
+            filename = self.filename
+        else:
+            base, extension = os.path.splitext(self.filename)
+            filename = f"{base}.{self.file_index}{extension}"
+        self.file_index += 1
+
+        self.file = open(filename, 'wb')
+        header = (','.join(self.keys) + '\n').encode()
+        if self.file_format == 'binary':
+            header = self.BINARY_MAGIC + header
+        self.file.write(header)
+        self.file_bytes = len(header)
+        self.file_opened_at = time.monotonic()
+
+    def rotate_if_needed(self):
+        if (self.max_bytes is not None and self.file_bytes >= self.max_bytes) or \
+           (self.max_seconds is not None and time.monotonic() - self.file_opened_at >= self.max_seconds):
+            self.file.close()
+            self.open_file()
+
+    def flush(self):
+        """Write all queued records"""
+        records = []
+        queue = self.queue
+        while queue:
+            records.append(queue.popleft())
+        if not records:
+            return
+
+        if self.file_format == 'binary':
+            pack = self.record.pack
+            data = b''.join(pack(*(float('nan') if v is None else v for v in record)) for record in records)
+        else:
+            data = ''.join(
+                ','.join('' if v is None else str(v) for v in record) + '\n' for record in records
+            ).encode()
+        self.rotate_if_needed()
+        self.file.write(data)
+        self.file.flush()
+        self.file_bytes += len(data)
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def close(self):
+        self.closed = True
+        self._stop_event.set()
+        self._thread.join()
+        self.file.close()
@@ -1,4 +1,15 @@
-from canopen_sdk.manager.motor_manager import MotorManager
-from canopen_sdk.manager.manager_loader import load_motor_manager
+from canopen_sdk.manager.motor_manager import MotorManager, MotorBringUpError
+from canopen_sdk.manager.async_motor_manager import AsyncMotorManager
+from canopen_sdk.manager.multi_bus_motor_manager import MultiBusMotorManager
+from canopen_sdk.manager.sync_producer import SyncProducer
+from canopen_sdk.manager.fault_monitor import FaultMonitor, FaultEvent
+from canopen_sdk.manager.state_table import StateTable, StateSnapshot
+from canopen_sdk.manager.cyclic_streamer import CyclicStreamer
+from canopen_sdk.manager.motion_estimator import MotionEstimator
+from canopen_sdk.manager.state_history import StateHistory
+from canopen_sdk.manager.trajectory import interpolate_trajectory
+from canopen_sdk.manager.manager_loader import load_motor_manager, load_multi_bus_motor_manager
 
-__all__ = ['MotorManager', 'load_motor_manager']
\ No newline at end of file
+__all__ = ['MotorManager', 'MotorBringUpError', 'AsyncMotorManager', 'MultiBusMotorManager', 'SyncProducer',
+           'FaultMonitor', 'FaultEvent', 'StateTable', 'StateSnapshot', 'CyclicStreamer', 'MotionEstimator',
+           'StateHistory', 'interpolate_trajectory', 'load_motor_manager', 'load_multi_bus_motor_manager']
\ No newline at end of file
@@ -0,0 +1,133 @@
+import asyncio
+import functools
+from canopen_sdk.manager.motor_manager import MotorManager
+
+class AsyncMotorManager:
+    """asyncio front end of a MotorManager, sharing its network, motors and state table.
+
+    Waits for statusword changes and SYNC snapshots are resolved from the
+    receive thread with call_soon_threadsafe, so the event loop never polls or
+    blocks. SDO transfers and the bring-up sequence stay blocking in canopen and
+    run in the loop's default executor, one transfer per motor at a time.
+    """
+    def __init__(self, motor_manager=None, **kwargs):
+        self.motor_manager = motor_manager if motor_manager is not None else MotorManager(**kwargs)
+        self.sdo_locks = {}
+
+    @property
+    def motors(self):
+        return self.motor_manager.motors
+
+    def add_motor(self, motor):
+        self.motor_manager.add_motor(motor)
+
+    async def run_in_executor(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(function, *args, **kwargs))
+
+    async def start_sync_all_motors(self, interval=0.01, timeout=None):
+        """Bring up all motors, every node configured in its own thread"""
+        await self.run_in_executor(self.motor_manager.start_sync_all_motors, interval, True, timeout)
+
+    async def stop_sync_all_motors(self):
+        await self.run_in_executor(self.motor_manager.stop_sync_all_motors)
+
+    def sdo_lock(self, name):
+        # One SDO client per node, transfers to the same node must not overlap
+        if name not in self.sdo_locks:
+            self.sdo_locks[name] = asyncio.Lock()
+        return self.sdo_locks[name]
+
+    async def read_sdo(self, name, key):
+        """Read a raw value, key as accepted by BaseMotorInterface.find_parameter"""
+        motor = self.motors[name]
+        async with self.sdo_lock(name):
+            return await self.run_in_executor(lambda: motor.find_parameter(key).raw)
+
+    async def write_sdo(self, name, key, value):
+        """Write a raw value, key as accepted by BaseMotorInterface.find_parameter"""
+        motor = self.motors[name]
+        async with self.sdo_lock(name):
+            await self.run_in_executor(setattr, motor.find_parameter(key), 'raw', value)
+
+    async def read_sdos(self, key, names=None):
+        """Read the same object from several motors concurrently, {name: value}"""
+        names = list(self.motors) if names is None else names
+        values = await asyncio.gather(*(self.read_sdo(name, key) for name in names))
+        return dict(zip(names, values))
+
+    def set_positions(self, positions, sync=False):
+        """Stage target positions and send them now or before the next SYNC, does not block"""
+        self.motor_manager.set_positions(positions, sync)
+
+    def set_torques(self, torques, sync=False):
+        """Stage target torques and send them now or before the next SYNC, does not block"""
+        self.motor_manager.set_torques(torques, sync)
+
+    async def wait_for_statusword(self, name, predicate, description='statusword', timeout=None):
+        """Wait until predicate(statusword) holds for one motor"""
+        motor = self.motors[name]
+        timeout = motor.state_timeout if timeout is None else timeout
+        if not motor.pdo_callback_added:
+            # No TPDO yet, fall back to SDO polling in a worker thread
+            return await self.run_in_executor(motor.wait_for_statusword, predicate, description, timeout)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def on_statusword(motor, previous_statusword, statusword):
+            if predicate(statusword):
+                loop.call_soon_threadsafe(set_result, future, statusword)
+
+        motor.add_statusword_callback(on_statusword)
+        try:
+            statusword = motor.motor_status.statusword
+            if statusword is not None and predicate(statusword):
+                return statusword
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{name}: {description} not confirmed within {timeout} s "
+                               f"(statusword={motor.motor_status.statusword})") from None
+        finally:
+            motor.remove_statusword_callback(on_statusword)
+
+    async def wait_for_state(self, name, state, timeout=None):
+        """Wait until one motor reports the given CiA 402 state"""
+        mask, value = self.motors[name].STATES[state]
+        return await self.wait_for_statusword(
+            name, lambda statusword: statusword & mask == value, state, timeout)
+
+    async def wait_for_all_states(self, state='OPERATION_ENABLED', timeout=None):
+        """Wait until every motor reports the given CiA 402 state, {name: statusword}"""
+        names = list(self.motors)
+        statuswords = await asyncio.gather(*(self.wait_for_state(name, state, timeout) for name in names))
+        return dict(zip(names, statuswords))
+
+    async def snapshots(self, max_queue_length=100):
+        """Iterate over the StateSnapshot of every SYNC cycle, dropping the oldest when the consumer lags"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(max_queue_length)
+
+        def on_publish(snapshot):
+            try:
+                loop.call_soon_threadsafe(put_latest, queue, snapshot)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+
+        state_table = self.motor_manager.state_table
+        state_table.add_listener(on_publish)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            state_table.remove_listener(on_publish)
+
+def set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+def put_latest(queue, item):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
@@ -0,0 +1,128 @@
+from collections import deque
+from canopen_sdk.manager.trajectory import interpolate_trajectory
+
+class CyclicStreamer:
+    """Streams set-points to motors in cyclic synchronous position/torque mode,
+    or in interpolated position mode where the drive interpolates between them.
+
+    Every SYNC period exactly one RPDO is written per streamed axis, right before
+    the SYNC frame so the drive latches it on that SYNC. When an axis queue runs
+    dry its last set-point is repeated and counted as a held cycle. Pushing more
+    than max_queue_length queued set-points per axis raises ValueError, nothing
+    queued is ever dropped.
+    """
+    STAGES = {
+        'CYCLIC_SYNC_POSITION': 'stage_position',
+        'CYCLIC_SYNC_TORQUE':   'stage_torque',
+        'INTERPOLATED_POSITION': 'stage_position',
+    }
+
+    def __init__(self, motor_manager, names=None, max_queue_length=10000):
+        self.motor_manager = motor_manager
+        self.sync_producer = motor_manager.sync_producer
+        names = list(motor_manager.motors) if names is None else names
+
+        self.motors = {}
+        for name in names:
+            motor = motor_manager.motors[name]
+            if motor.operation_mode not in self.STAGES:
+                raise ValueError(f"{name} is in {motor.operation_mode}, not a streaming mode")
+            self.motors[name] = motor
+
+        self.max_queue_length = max_queue_length
+        self.queues = {name: deque() for name in self.motors}
+        self.last_setpoints = {}
+        self.held_cycles = {name: 0 for name in self.motors}
+        self.running = False
+
+    def start(self):
+        """Hold the current positions and start streaming on the next SYNC"""
+        if self.running:
+            return
+        for name, motor in self.motors.items():
+            if motor.operation_mode != 'CYCLIC_SYNC_TORQUE':
+                self.last_setpoints[name] = motor.get_position()
+            else:
+                self.last_setpoints[name] = 0.0
+            if self.sync_producer.period:
+                motor.set_cycle_period(self.sync_producer.period)
+        self.sync_producer.reset_statistics()
+        self.held_cycles = {name: 0 for name in self.motors}
+        self.sync_producer.add_callback(self.on_sync)
+        self.running = True
+
+    def stop(self):
+        """Stop streaming, the drives keep the last set-point"""
+        self.sync_producer.remove_callback(self.on_sync)
+        self.running = False
+
+    def check_room(self, name, count):
+        """Raise ValueError if count more set-points do not fit into the queue of name"""
+        if self.max_queue_length is not None and len(self.queues[name]) + count > self.max_queue_length:
+            raise ValueError(f"{name}: {count} set-points do not fit into the queue, "
+                             f"{len(self.queues[name])} of {self.max_queue_length} queued")
+
+    def push(self, name, setpoints):
+        """Queue set-points for one axis, one per SYNC period"""
+        setpoints = list(setpoints)
+        self.check_room(name, len(setpoints))
+        self.queues[name].extend(setpoints)
+
+    def push_all(self, setpoints):
+        """Queue one set-point per axis for the same SYNC period"""
+        for name in setpoints:
+            self.check_room(name, 1)
+        for name, value in setpoints.items():
+            self.queues[name].append(value)
+
+    def push_trajectory(self, name, times, positions, method='cubic'):
+        """Interpolate a trajectory to the SYNC period and queue it for one axis"""
+        self.push(name, self._interpolate(times, positions, method))
+
+    def push_trajectories(self, trajectories, method='cubic'):
+        """Interpolate {name: (times, positions)} and queue them to start on the same SYNC"""
+        samples = {
+            name: self._interpolate(times, positions, method)
+            for name, (times, positions) in trajectories.items()
+        }
+
+        # Pad the queues with their last set-point so all trajectories start together
+        length = max(len(self.queues[name]) for name in samples)
+        for name in samples:
+            self.check_room(name, length - len(self.queues[name]) + len(samples[name]))
+        for name in samples:
+            queue = self.queues[name]
+            last = queue[-1] if queue else self.last_setpoints.get(name, samples[name][0])
+            queue.extend([last] * (length - len(queue)))
+            queue.extend(samples[name])
+
+    def _interpolate(self, times, positions, method):
+        if not self.sync_producer.period:
+            raise ValueError("SYNC period is unknown, start SYNC before queueing trajectories")
+        return interpolate_trajectory(times, positions, self.sync_producer.period, method)
+
+    def clear(self):
+        for queue in self.queues.values():
+            queue.clear()
+
+    def get_queue_lengths(self):
+        return {name: len(queue) for name, queue in self.queues.items()}
+
+    def on_sync(self, cycle):
+        for name, motor in self.motors.items():
+            queue = self.queues[name]
+            if queue:
+                value = queue.popleft()
+                self.last_setpoints[name] = value
+            else:
+                value = self.last_setpoints[name]
+                self.held_cycles[name] += 1
+            getattr(motor, self.STAGES[motor.operation_mode])(value)
+            motor.transmit_command()
+
+    def get_statistics(self):
+        """Get SYNC timing statistics and per-axis held cycles"""
+        statistics = self.sync_producer.get_statistics()
+        statistics['held_cycles'] = dict(self.held_cycles)
+        statistics['queue_lengths'] = self.get_queue_lengths()
+        return statistics
@@ -0,0 +1,113 @@
+import time
+import queue
+
+# Statusword bit 3
+FAULT = 1 << 3
+
+class FaultEvent:
+    """One fault transition or EMCY frame of one motor"""
+    def __init__(self, name, node_id, kind, statusword=None, error_code=None,
+                 description=None, cycle=0, timestamp=0.0):
+        self.name = name
+        self.node_id = node_id
+        # 'fault', 'fault_cleared' or 'emcy'
+        self.kind = kind
+        self.statusword = statusword
+        self.error_code = error_code
+        self.description = description
+        self.cycle = cycle
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        code = 'None' if self.error_code is None else f"0x{self.error_code:04X}"
+        return (f"FaultEvent({self.name!r}, {self.kind!r}, statusword={self.statusword}, "
+                f"error_code={code}, description={self.description!r})")
+
+class FaultMonitor:
+    """Detects faults in the receive path instead of by polling.
+
+    Statusword fault transitions (from the TPDO callbacks) and EMCY frames of
+    every motor are turned into FaultEvents as they arrive. Each event is passed
+    to the registered callbacks and put on the events queue in the receive
+    thread, so callbacks must not block or use SDO. With quick_stop_all set, the
+    first fault quick-stops every motor by RPDO and inhibits further commands
+    until the motors are switched on again.
+    """
+    def __init__(self, motor_manager, quick_stop_all=False, max_queue_length=1000):
+        self.motor_manager = motor_manager
+        self.quick_stop_all = quick_stop_all
+        self.callbacks = []
+        self.events = queue.Queue(max_queue_length)
+        self.dropped_events = 0
+        self.faulted = {}
+        self.tripped = False
+        self.emcy_callbacks = {}
+
+    def add_callback(self, callback):
+        """Call callback(event) for every FaultEvent, from the receive thread"""
+        self.callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def start(self):
+        """Watch all motors of the manager"""
+        self.tripped = False
+        for name, motor in self.motor_manager.motors.items():
+            if name in self.emcy_callbacks:
+                continue
+            motor.add_statusword_callback(self.on_statusword)
+            emcy_callback = lambda emcy, motor=motor: self.on_emcy(motor, emcy)
+            motor.node.emcy.add_callback(emcy_callback)
+            self.emcy_callbacks[name] = emcy_callback
+
+    def stop(self):
+        for name, emcy_callback in self.emcy_callbacks.items():
+            motor = self.motor_manager.motors[name]
+            motor.remove_statusword_callback(self.on_statusword)
+            if emcy_callback in motor.node.emcy.callbacks:
+                motor.node.emcy.callbacks.remove(emcy_callback)
+        self.emcy_callbacks = {}
+
+    def get_faulted_motors(self):
+        """Get {name: FaultEvent} of the motors currently in fault"""
+        return dict(self.faulted)
+
+    def on_statusword(self, motor, previous_statusword, statusword):
+        was_fault = previous_statusword is not None and previous_statusword & FAULT
+        if statusword & FAULT and not was_fault:
+            # Drives send the EMCY before the statusword of the next SYNC, so it is cached by now
+            if motor.error_code:
+                event = self.report(motor, 'fault', statusword, motor.error_code, motor.error_description)
+            else:
+                event = self.report(motor, 'fault', statusword)
+            self.faulted[motor.name] = event
+            if self.quick_stop_all and not self.tripped:
+                self.trip()
+        elif was_fault and not statusword & FAULT:
+            self.faulted.pop(motor.name, None)
+            self.report(motor, 'fault_cleared', statusword)
+
+    def on_emcy(self, motor, emcy):
+        # Registered after motor.on_emcy, so the motor has decoded the error already
+        self.report(motor, 'emcy', motor.motor_status.statusword, emcy.code, motor.error_description,
+                    emcy.timestamp)
+
+    def report(self, motor, kind, statusword, error_code=None, description=None, timestamp=None):
+        event = FaultEvent(motor.name, motor.node_id, kind, statusword, error_code, description,
+                           self.motor_manager.state_table.sync_cycle,
+                           time.time() if timestamp is None else timestamp)
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.dropped_events += 1
+        for callback in self.callbacks:
+            callback(event)
+        return event
+
+    def trip(self):
+        """Quick stop all motors by RPDO and hold their commands"""
+        self.tripped = True
+        for motor in self.motor_manager.motors.values():
+            motor.transmit_quick_stop()
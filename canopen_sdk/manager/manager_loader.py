@@ -1,30 +1,34 @@
-import os
-import json
+from canopen_sdk.driver_registry import load_motor
+from canopen_sdk.motor_config import load_motor_configs
+from canopen_sdk.manager import MotorManager, MultiBusMotorManager
 
-from canopen_sdk.elmo import ELMOLoader
-from canopen_sdk.erob import EROBLoader
-from canopen_sdk.manager import MotorManager
+def load_motor_manager(motor_config_file_path, channel='can0', bustype='socketcan', bitrate=1000000,
+                       object_dictionary_cache_dir=None):
+    # Validate the whole config before creating anything
+    motor_configs = load_motor_configs(motor_config_file_path, channel)
 
-def load_motor_manager(motor_config_file_path, channel='can0', bustype='socketcan', bitrate=1000000):
-    # Check if file exists
-    if not os.path.exists(motor_config_file_path):
-        raise FileNotFoundError(f"Motor config file not found: {motor_config_file_path}")
+    # Create Motor Manager
+    motor_manager = MotorManager(channel=channel, bustype=bustype, bitrate=bitrate,
+                                 object_dictionary_cache_dir=object_dictionary_cache_dir)
+
+    # Add motors to manager, importing only the drivers the config uses
+    for motor_config in motor_configs:
+        motor_manager.add_motor(load_motor(motor_config))
+
+    return motor_manager
 
-    # Load Motor Config
-    with open(motor_config_file_path, 'r') as f:
-        motor_configs = json.load(f)
-    motor_configs = motor_configs.get('motors', [])
+def load_multi_bus_motor_manager(motor_config_file_path, channel='can0', bustype='socketcan', bitrate=1000000,
+                                 object_dictionary_cache_dir=None, quick_stop_on_fault=False):
+    """Like load_motor_manager, with each motor on the 'channel' of its config (default channel)"""
+    motor_configs = load_motor_configs(motor_config_file_path, channel)
 
     # Create Motor Manager
-    motor_manager = MotorManager(channel=channel, bustype=bustype, bitrate=bitrate)
+    motor_manager = MultiBusMotorManager(bustype=bustype, bitrate=bitrate,
+                                         quick_stop_on_fault=quick_stop_on_fault,
+                                         object_dictionary_cache_dir=object_dictionary_cache_dir)
 
-    # Add motors to manager
+    # Add motors to the manager of their bus
     for motor_config in motor_configs:
-        if motor_config['vendor_type'] == 'elmo':
-            motor = ELMOLoader.load_motor(motor_config)
-            motor_manager.add_motor(motor)
-        elif motor_config['vendor_type'] == 'eRob':
-            motor = EROBLoader.load_motor(motor_config)
-            motor_manager.add_motor(motor)
+        motor_manager.add_motor(load_motor(motor_config), motor_config.channel)
 
     return motor_manager
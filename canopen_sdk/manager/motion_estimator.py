@@ -0,0 +1,114 @@
+import threading
+from array import array
+
+class MotionEstimator:
+    """Estimates position, velocity and acceleration of all joints on the actual
+    receive timestamps of their TPDOs.
+
+    Every published SYNC cycle copies the position and timestamp columns of the
+    state table into a ring of window cycles, two array slice copies for all
+    joints, so the receive path does no per-joint math. estimate() fits a
+    quadratic by least squares to the distinct samples of each joint, a
+    Savitzky-Golay filter on uneven timestamps, so jitter, dropped frames and
+    repeated frames do not show up as acceleration spikes.
+    """
+    def __init__(self, motor_manager, window=8):
+        if window < 3:
+            raise ValueError(f"window must hold at least 3 cycles, got {window}")
+        self.state_table = motor_manager.state_table
+        self.window = window
+        self.names = ()
+        self.timestamps = array('d')
+        self.positions = array('d')
+        self.count = 0
+        self.lock = threading.Lock()
+        self.running = False
+
+    def start(self):
+        """Start sampling every published SYNC cycle"""
+        if self.running:
+            return
+        self.names = self.state_table.names
+        size = self.window * len(self.names)
+        with self.lock:
+            self.timestamps = array('d', bytes(8 * size))
+            self.positions = array('d', bytes(8 * size))
+            self.count = 0
+        self.state_table.add_listener(self.on_snapshot)
+        self.running = True
+
+    def stop(self):
+        self.state_table.remove_listener(self.on_snapshot)
+        self.running = False
+
+    def on_snapshot(self, snapshot):
+        # Called with every published cycle, only ever from the receive thread
+        joint_count = len(self.names)
+        if snapshot.names != self.names:
+            return
+        fields = snapshot.FIELDS
+        position = fields.index('position') * joint_count
+        timestamp = fields.index('timestamp') * joint_count
+        start = (self.count % self.window) * joint_count
+        with self.lock:
+            self.positions[start:start + joint_count] = snapshot.data[position:position + joint_count]
+            self.timestamps[start:start + joint_count] = snapshot.data[timestamp:timestamp + joint_count]
+            self.count += 1
+
+    def estimate(self):
+        """Get {name: (position, velocity, acceleration)} at the latest sample of each joint"""
+        with self.lock:
+            timestamps = self.timestamps[:]
+            positions = self.positions[:]
+            rows = min(self.count, self.window)
+        joint_count = len(self.names)
+
+        estimates = {}
+        for joint, name in enumerate(self.names):
+            # A frame repeated over several cycles is one sample, a zero timestamp no sample
+            samples = {}
+            for i in range(joint, rows * joint_count, joint_count):
+                if timestamps[i]:
+                    samples[timestamps[i]] = positions[i]
+            estimates[name] = _fit_quadratic(samples)
+        return estimates
+
+    def get_positions(self):
+        return {name: estimate[0] for name, estimate in self.estimate().items()}
+
+    def get_velocities(self):
+        return {name: estimate[1] for name, estimate in self.estimate().items()}
+
+    def get_accelerations(self):
+        return {name: estimate[2] for name, estimate in self.estimate().items()}
+
+def _fit_quadratic(samples):
+    # Least squares p(t) = c0 + c1 t + c2 t^2 with t relative to the latest sample
+    if not samples:
+        return (0.0, 0.0, 0.0)
+    latest = max(samples)
+    if len(samples) == 1:
+        return (samples[latest], 0.0, 0.0)
+    span = latest - min(samples)
+    if len(samples) == 2:
+        earliest = min(samples)
+        return (samples[latest], (samples[latest] - samples[earliest]) / span, 0.0)
+
+    # Normal equations on t / span, which keeps them well conditioned
+    s0 = s1 = s2 = s3 = s4 = y0 = y1 = y2 = 0.0
+    for t, p in samples.items():
+        u = (t - latest) / span
+        u2 = u * u
+        s0 += 1.0
+        s1 += u
+        s2 += u2
+        s3 += u2 * u
+        s4 += u2 * u2
+        y0 += p
+        y1 += p * u
+        y2 += p * u2
+    det = s0 * (s2 * s4 - s3 * s3) - s1 * (s1 * s4 - s3 * s2) + s2 * (s1 * s3 - s2 * s2)
+    c0 = (y0 * (s2 * s4 - s3 * s3) - s1 * (y1 * s4 - s3 * y2) + s2 * (y1 * s3 - s2 * y2)) / det
+    c1 = (s0 * (y1 * s4 - y2 * s3) - y0 * (s1 * s4 - s3 * s2) + s2 * (s1 * y2 - y1 * s2)) / det
+    c2 = (s0 * (s2 * y2 - s3 * y1) - s1 * (s1 * y2 - s2 * y1) + y0 * (s1 * s3 - s2 * s2)) / det
+    return (c0, c1 / span, 2.0 * c2 / (span * span))
@@ -1,30 +1,129 @@
 import time
+import threading
 import canopen
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from canopen_sdk.manager.sync_producer import SyncProducer
+from canopen_sdk.manager.state_table import StateTable
+from canopen_sdk.manager.fault_monitor import FaultMonitor
+from canopen_sdk.common.metrics import to_json, to_prometheus
+from canopen_sdk.common.object_dictionary_cache import ObjectDictionaryCache
+from canopen_sdk.common.pdo_planner import BusOverloadError, pdo_frames, predict_bus_load
+
+class MotorBringUpError(RuntimeError):
+    def __init__(self, errors):
+        self.errors = errors
+        details = ', '.join(f"{name}: {error!r}" for name, error in errors.items())
+        super().__init__(f"Bring-up failed on {len(errors)} motor(s): {details}")
 
 class MotorManager:
-    def __init__(self, channel='can0', bustype='socketcan', bitrate=1000000):
+    def __init__(self, channel='can0', bustype='socketcan', bitrate=1000000, object_dictionary_cache_dir=None,
+                 quick_stop_on_fault=False, max_bus_load=1.0):
         # CANOpen Network
         self.network = canopen.Network()
         self.channel = channel
         self.bustype = bustype
         self.bitrate = bitrate
+
+        # Highest predicted bus load start_sync_all_motors accepts
+        self.max_bus_load = max_bus_load
+
+        # Object dictionaries parsed once per file, optionally cached on disk
+        self.object_dictionaries = ObjectDictionaryCache(object_dictionary_cache_dir)
        
         # Motor Config
         self.motors = {}
         self.name_to_id = {}
+        self.bring_up_errors = {}
+
+        # Latest state of all motors, written in place by the TPDO callbacks
+        self.state_table = StateTable()
+
+        # Commands staged for the next SYNC
+        self.staged_motors = {}
+        self.command_lock = threading.Lock()
+        self.sync_producer = SyncProducer(self.network)
+        self.metrics_enabled = False
+
+        # Fault events from the receive path, optionally quick-stopping all motors
+        self.fault_monitor = FaultMonitor(self, quick_stop_on_fault)
 
     def add_motor(self, motor):
         # Add Motor to Network
-        motor.node = self.network.add_node(motor.node_id, motor.object_dictionary_file_path)
-        motor.node.sdo.RESPONSE_TIMEOUT = 2.0
-        motor.node.sdo.MAX_RETRIES = 3
-        motor.network = self.network
+        self.add_motor_node(motor)
+
+        # Fail now, before bring-up, if the config does not match the object dictionary
+        try:
+            motor.check_configuration()
+        except ValueError:
+            del self.network[motor.node_id]
+            raise
 
         # Add Motor to Manager
         self.motors[motor.name] = motor
         self.name_to_id[motor.name] = motor.node_id
+        self.state_table.add_motor(motor)
+        motor.node.emcy.add_callback(motor.on_emcy)
+        if self.metrics_enabled:
+            motor.enable_metrics()
+
+    def add_motor_node(self, motor):
+        """Add the remote node of motor.node_id to the network"""
+        object_dictionary = self.object_dictionaries.get(motor.object_dictionary_file_path, motor.node_id)
+        motor.node = self.network.add_node(motor.node_id, object_dictionary)
+        motor.node.sdo.RESPONSE_TIMEOUT = 2.0
+        motor.node.sdo.MAX_RETRIES = 3
+        motor.network = self.network
+
+    def run_on_all_motors(self, steps, parallel=False, timeout=None):
+        """Run the named motor methods in order on every motor, optionally one thread per motor.
+
+        timeout only applies with parallel=True. A node that exceeds it is
+        reported in MotorBringUpError and runs none of its remaining steps, but
+        the step it is in cannot be interrupted: its SDO transfer or state wait
+        finishes in the background, bounded by the SDO and state timeouts.
+        """
+        if not parallel:
+            for motor in self.motors.values():
+                for step in steps:
+                    getattr(motor, step)()
+            return {}
+
+        errors = {}
+        cancelled = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=max(len(self.motors), 1))
+        futures = {
+            name: executor.submit(self._run_motor_steps, motor, steps, cancelled)
+            for name, motor in self.motors.items()
+        }
+
+        # All nodes start together, so one deadline is a per-node timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name, future in futures.items():
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            try:
+                future.result(remaining)
+            except FutureTimeoutError:
+                errors[name] = TimeoutError(f"{'/'.join(steps)} did not finish within {timeout} s")
+            except Exception as e:
+                errors[name] = e
 
-    def reset_all_motors(self):
+        # Timed-out nodes stop after their current step
+        cancelled.set()
+        executor.shutdown(wait=False)
+
+        self.bring_up_errors.update(errors)
+        if errors:
+            raise MotorBringUpError(errors)
+        return errors
+
+    def _run_motor_steps(self, motor, steps, cancelled):
+        for step in steps:
+            if cancelled.is_set():
+                return
+            getattr(motor, step)()
+
+    def reset_all_motors(self, parallel=False, timeout=None):
         # Stop
         self.network.nmt.send_command(0x02)
         self.pause_for_seconds(0.5)
@@ -34,88 +133,155 @@ class MotorManager:
         self.pause_for_seconds(1.0)
 
         # Reset All Motors
-        for motor in self.motors.values():
-            motor.reset_motor()
+        self.run_on_all_motors(('reset_motor',), parallel, timeout)
 
         # Start
         self.network.nmt.send_command(0x01)
         self.pause_for_seconds(0.5)
         
-    def initialize_all_motors(self):
+    def initialize_all_motors(self, parallel=False, timeout=None):
         # Initialize All Motors
-        for motor in self.motors.values():
-            motor.initialize_motor()
+        self.run_on_all_motors(('initialize_motor',), parallel, timeout)
         self.pause_for_seconds(0.5)
 
-    def setup_all_PDO_mapping(self):
+    def setup_all_PDO_mapping(self, parallel=False, timeout=None):
         # Setup PDO Mapping
-        for motor in self.motors.values():
-            motor.setup_pdo_mapping()
+        self.run_on_all_motors(('setup_pdo_mapping',), parallel, timeout)
         
         # Start
         self.network.nmt.send_command(0x01)
         self.pause_for_seconds(0.5)
         
-    def command_all_switches_on(self):
+    def command_all_switches_on(self, parallel=False, timeout=None):
         # Command All Switches On
+        self.run_on_all_motors(('command_switch_on',), parallel, timeout)
+
+    def predict_bus_load(self, interval=0.01):
+        """Predict the bus load of SYNC and the PDOs of all motors, built locally without bus I/O"""
+        frames = []
         for motor in self.motors.values():
-            motor.command_switch_on()
-        self.pause_for_seconds(0.5)
+            motor.build_pdo_mapping()
+            frames.extend(pdo_frames(motor.node))
+        return predict_bus_load(frames, interval, self.bitrate)
+
+    def check_bus_load(self, interval=0.01):
+        bus_load = self.predict_bus_load(interval)
+        if bus_load > self.max_bus_load:
+            raise BusOverloadError(bus_load, self.max_bus_load)
+        return bus_load
 
     def add_all_PDO_callbacks(self):
+        # The TPDOs of this bring-up complete the state table cycles, not earlier ones
+        self.state_table.clear_cycle_pdos()
+
         # Add PDO Callbacks
         for motor in self.motors.values():
             motor.add_pdo_callback()
+            if motor.metrics is not None:
+                motor.metrics.instrument()
+
+            # TPDOs sent on every SYNC complete a state table cycle
+            for pdo_map in motor.node.tpdo.map.values():
+                if pdo_map.enabled and pdo_map.callbacks and pdo_map.trans_type == 1:
+                    self.state_table.add_cycle_pdo(pdo_map)
         self.pause_for_seconds(0.5)
 
-    def start_sync_all_motors(self, interval=0.01):
+    def start_sync_all_motors(self, interval=0.01, parallel=False, timeout=None):
+        """Bring up all motors. With parallel=True every node is configured in its own
+        thread; a node that fails or exceeds timeout is reported in MotorBringUpError.errors.
+        timeout is ignored when parallel is False, see run_on_all_motors
+        """
+        self.configure_all_motors(interval, parallel, timeout)
+        self.enable_all_motors(interval, parallel, timeout)
+
+    def configure_all_motors(self, interval=0.01, parallel=False, timeout=None):
+        """First half of start_sync_all_motors: connect, reset, initialize and map the PDOs"""
+        self.bring_up_errors = {}
+
+        # Refuse PDO configurations the bus cannot carry at this SYNC rate
+        self.check_bus_load(interval)
+
         # Connect
         self.network.connect(channel=self.channel, bustype=self.bustype, bitrate=self.bitrate)
         self.pause_for_seconds(0.1)
 
         # Reset
-        self.reset_all_motors()
+        self.reset_all_motors(parallel, timeout)
 
         # Initialize
-        self.initialize_all_motors()
+        self.initialize_all_motors(parallel, timeout)
 
         # PDO Mapping
-        self.setup_all_PDO_mapping()
+        self.setup_all_PDO_mapping(parallel, timeout)
 
         # PDO Callbacks
         self.add_all_PDO_callbacks()
 
-        # Start Sync
-        self.network.sync.start(interval)
-        self.pause_for_seconds(3.0)
+    def enable_all_motors(self, interval=0.01, parallel=False, timeout=None, start_time=None):
+        """Second half of start_sync_all_motors: start SYNC, the first one at start_time
+        (time.perf_counter clock) if given, and switch on all motors
+        """
+        # Set dt, before the first TPDO of this SYNC period is received
+        for motor in self.motors.values():
+            motor.set_dt(interval)
 
-        # Switch On
-        self.command_all_switches_on()
+        # Start Sync, state table cycles are numbered from the SYNC schedule
+        if start_time is None:
+            start_time = time.perf_counter()
+        self.state_table.reset_cycles(interval, start_time, self.sync_producer.cycle + 1)
+        self.sync_producer.start(interval, start_time)
 
-        # Set dt
+        # Wait for the first TPDO of every motor
         for motor in self.motors.values():
-            motor.set_dt(interval)
+            motor.wait_for_statusword(lambda statusword: True, 'first TPDO', timeout=3.0)
+
+        # Switch On
+        self.command_all_switches_on(parallel, timeout)
+
+        # Watch for faults
+        self.fault_monitor.start()
         
     def stop_sync_all_motors(self):
+        self.fault_monitor.stop()
+
         # Quick Stop
         for motor in self.motors.values():
             motor.command_quick_stop()
 
         # Stop Sync
-        self.network.sync.stop()
-        
+        self.sync_producer.stop()
+
+        # Drop the TPDO callbacks and cached statuswords, they are stale once SYNC stops
+        for motor in self.motors.values():
+            motor.remove_tpdo_callbacks()
+
         # Stop all nodes
         self.network.nmt.send_command(0x02)
         
         self.network.disconnect()
         
-        #if close_logger:
-        #    for motor in self.motors.values():
-        #        motor.close_logger()
+        # Close loggers
+        for motor in self.motors.values():
+            motor.close_logger()
         
+    def open_all_loggers(self, file_format='csv', **kwargs):
+        """Log the state of every motor to logs/<name> from background writer threads"""
+        for motor in self.motors.values():
+            motor.open_logger(file_format=file_format, **kwargs)
+
     def set_position(self, name, value):
         if name in self.motors:
             self.motors[name].set_position(value)
+
+    def set_positions(self, positions, sync=False):
+        """Stage target positions of several motors and send them in one burst,
+        or right before the next SYNC if sync is True
+        """
+        self.stage_commands('stage_position', positions)
+        if sync:
+            self.transmit_on_sync()
+        else:
+            self.transmit_commands()
     
     def set_velocity(self, name, value):
         """This function is not implemented for the base class"""
@@ -128,31 +294,85 @@ class MotorManager:
     def set_torque(self, name, value):
         if name in self.motors:
             self.motors[name].set_torque(value)
+
+    def set_torques(self, torques, sync=False):
+        """Stage target torques of several motors and send them in one burst,
+        or right before the next SYNC if sync is True
+        """
+        self.stage_commands('stage_torque', torques)
+        if sync:
+            self.transmit_on_sync()
+        else:
+            self.transmit_commands()
+
+    def stage_commands(self, stage, values):
+        with self.command_lock:
+            for name, value in values.items():
+                if name in self.motors:
+                    motor = self.motors[name]
+                    getattr(motor, stage)(value)
+                    self.staged_motors[name] = motor
+
+    def transmit_on_sync(self):
+        """Send staged commands right before every SYNC from now on. SYNC is then
+        sent by the SYNC producer's thread instead of the interface's periodic task
+        """
+        self.sync_producer.add_callback(self.transmit_commands)
+
+    def transmit_commands(self, cycle=None):
+        """Transmit all staged RPDOs, called by the SYNC producer before every SYNC"""
+        with self.command_lock:
+            if not self.staged_motors:
+                return
+            motors, self.staged_motors = self.staged_motors, {}
+        for motor in motors.values():
+            motor.transmit_command()
         
     def get_positions(self):
-        positions = {}
-        for name, motor in self.motors.items():
-            positions[name] = motor.get_position()
-        return positions
+        return self.state_table.get('position')
 
     def get_velocities(self):
-        velocities = {}
-        for name, motor in self.motors.items():
-            velocities[name] = motor.get_velocity()
-        return velocities
+        return self.state_table.get('velocity')
     
     def get_accelerations(self):
-        accelerations = {}
-        for name, motor in self.motors.items():
-            accelerations[name] = motor.get_acceleration()
-        return accelerations
+        return self.state_table.get('acceleration')
     
     def get_torques(self):
-        torques = {}
-        for name, motor in self.motors.items():
-            torques[name] = motor.get_torque()
-        return torques
+        return self.state_table.get('torque')
+
+    def get_state_view(self, field):
+        """Get a live zero-copy view of one field for all motors, in state_table.names order"""
+        return self.state_table.view(field)
+
+    def get_state_snapshot(self):
+        """Get the state of all motors from the last complete SYNC cycle, with its cycle and timestamp"""
+        return self.state_table.latest()
     
+    def enable_metrics(self, callback_sample_interval=16):
+        """Collect per-motor and per-PDO metrics, read them with get_metrics or export_metrics"""
+        self.metrics_enabled = True
+        for motor in self.motors.values():
+            motor.enable_metrics(callback_sample_interval)
+
+    def get_metrics(self):
+        """Get a snapshot of all metrics as plain dicts"""
+        return {
+            'motors': {
+                name: motor.metrics.snapshot()
+                for name, motor in self.motors.items() if motor.metrics is not None
+            },
+            'sync': self.sync_producer.get_statistics(),
+            'incomplete_cycles': self.state_table.incomplete_cycles,
+        }
+
+    def export_metrics(self, file_format='prometheus'):
+        """Export get_metrics() in the Prometheus text format or as JSON"""
+        if file_format == 'prometheus':
+            return to_prometheus(self.get_metrics())
+        if file_format == 'json':
+            return to_json(self.get_metrics())
+        raise ValueError(f"Unknown metrics format: {file_format}")
+
     def get_position_range_limits(self):
         prl = {}
         for name, motor in self.motors.items():
@@ -160,17 +380,27 @@ class MotorManager:
         return prl
 
     def get_motor_states(self):
-        states = {}
-        for name, motor in self.motors.items():
-            states[name] = motor.get_motor_state()
-        return states
+        return self.state_table.latest().get_motor_states()
     
     def get_error_codes(self):
+        """Get the latest EMCY error code of every motor, without bus traffic"""
         error_codes = {}
         for name, motor in self.motors.items():
             error_codes[name] = motor.get_error_code()
         return error_codes
+
+    def get_errors(self):
+        """Get the latest decoded EMCY error of every motor"""
+        return {name: motor.get_error() for name, motor in self.motors.items()}
     
+    def add_fault_callback(self, callback):
+        """Call callback(FaultEvent) on every fault transition or EMCY of any motor, from the receive thread"""
+        self.fault_monitor.add_callback(callback)
+
+    def get_faulted_motors(self):
+        """Get {name: FaultEvent} of the motors currently in fault, without bus traffic"""
+        return self.fault_monitor.get_faulted_motors()
+
     def check_motor_states(self):
         states = self.get_motor_states()
         
@@ -180,7 +410,6 @@ class MotorManager:
             if v['fault'] or v['switch_on_disabled'] or not v['operation_enabled']:
                 error_motor.append(k)
                 is_state_error = True
-                break
         """
         is_state_error = any(
             v['fault'] or v['switch_on_disabled'] or not v['operation_enabled']
@@ -205,12 +434,21 @@ class MotorManager:
         return states, is_state_error, error_motor
         
     def reset_node_id(self, name, node_id):
-        self.motors[name].reset_node_id(node_id)
+        motor = self.motors[name]
+        motor.reset_node_id(node_id)
         self.network.nmt.send_command(0x82)
         self.pause_for_seconds(1.0)
-        
-        self.motors[name].node_id = node_id
         self.stop_sync_all_motors()
+
+        # Address the drive by its new node ID, with the same object dictionary
+        del self.network[motor.node_id]
+        motor.node_id = node_id
+        self.add_motor_node(motor)
+        self.name_to_id[name] = node_id
+        motor.node.emcy.add_callback(motor.on_emcy)
+        if motor.metrics is not None:
+            motor.metrics.instrument()
+
         self.start_sync_all_motors()
         
     def pause_for_seconds(self, value):
@@ -0,0 +1,175 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from canopen_sdk.manager.motor_manager import MotorManager, MotorBringUpError
+from canopen_sdk.manager.state_table import StateSnapshot
+from canopen_sdk.common.object_dictionary_cache import ObjectDictionaryCache
+
+class MultiBusMotorManager:
+    """Motors spread over several CAN channels behind one joint-name API.
+
+    Each channel gets its own MotorManager, so its own canopen Network with its
+    own receive thread and SYNC producer. All SYNC producers start on one
+    absolute schedule before the motors are switched on, so SYNCs leave every
+    bus together and merged snapshots combine the same cycle of each bus.
+    """
+    def __init__(self, bustype='socketcan', bitrate=1000000, quick_stop_on_fault=False,
+                 object_dictionary_cache_dir=None, **kwargs):
+        self.bustype = bustype
+        self.bitrate = bitrate
+        # A fault on any bus quick-stops the motors of all buses
+        self.quick_stop_on_fault = quick_stop_on_fault
+        # Passed on to every MotorManager
+        self.manager_kwargs = kwargs
+        # Object dictionaries are parsed once for all buses
+        self.object_dictionaries = ObjectDictionaryCache(object_dictionary_cache_dir)
+        self.buses = {}
+        self.motor_buses = {}
+
+    def add_bus(self, channel):
+        """Get the MotorManager of channel, creating it on first use"""
+        if channel not in self.buses:
+            motor_manager = MotorManager(channel=channel, bustype=self.bustype, bitrate=self.bitrate,
+                                         quick_stop_on_fault=self.quick_stop_on_fault, **self.manager_kwargs)
+            motor_manager.object_dictionaries = self.object_dictionaries
+            if self.quick_stop_on_fault:
+                motor_manager.add_fault_callback(self.on_fault_event)
+            self.buses[channel] = motor_manager
+        return self.buses[channel]
+
+    def on_fault_event(self, event):
+        # Called from the receive thread of the faulted bus
+        if event.kind == 'fault':
+            for motor_manager in self.buses.values():
+                if not motor_manager.fault_monitor.tripped:
+                    motor_manager.fault_monitor.trip()
+
+    def add_motor(self, motor, channel):
+        if motor.name in self.motor_buses and self.motor_buses[motor.name].channel != channel:
+            raise ValueError(f"{motor.name} is already on {self.motor_buses[motor.name].channel}")
+        motor_manager = self.add_bus(channel)
+        motor_manager.add_motor(motor)
+        self.motor_buses[motor.name] = motor_manager
+
+    @property
+    def motors(self):
+        return {name: motor_manager.motors[name] for name, motor_manager in self.motor_buses.items()}
+
+    def run_on_all_buses(self, method, *args):
+        """Call the named MotorManager method on every bus, one thread per bus"""
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max(len(self.buses), 1)) as executor:
+            futures = {
+                channel: executor.submit(getattr(motor_manager, method), *args)
+                for channel, motor_manager in self.buses.items()
+            }
+            for channel, future in futures.items():
+                try:
+                    future.result()
+                except MotorBringUpError as e:
+                    errors.update(e.errors)
+                except Exception as e:
+                    errors[channel] = e
+        if errors:
+            raise MotorBringUpError(errors)
+
+    def start_sync_all_motors(self, interval=0.01, parallel=False, timeout=None):
+        """Configure all buses concurrently, then start their SYNC producers on one
+        shared schedule before switching the motors on
+        """
+        self.run_on_all_buses('configure_all_motors', interval, parallel, timeout)
+
+        # Every bus counts cycles from the same number, the first SYNC one period from now
+        cycle = max((motor_manager.sync_producer.cycle for motor_manager in self.buses.values()), default=0)
+        for motor_manager in self.buses.values():
+            motor_manager.sync_producer.cycle = cycle
+        start_time = time.perf_counter() + interval
+        self.run_on_all_buses('enable_all_motors', interval, parallel, timeout, start_time)
+
+    def stop_sync_all_motors(self):
+        self.run_on_all_buses('stop_sync_all_motors')
+
+    def set_position(self, name, value):
+        if name in self.motor_buses:
+            self.motor_buses[name].set_position(name, value)
+
+    def set_torque(self, name, value):
+        if name in self.motor_buses:
+            self.motor_buses[name].set_torque(name, value)
+
+    def set_positions(self, positions, sync=False):
+        """Stage target positions on every bus and send them in one burst per bus,
+        or right before the next SYNC if sync is True
+        """
+        for motor_manager, values in self.split_by_bus(positions).items():
+            motor_manager.set_positions(values, sync)
+
+    def set_torques(self, torques, sync=False):
+        for motor_manager, values in self.split_by_bus(torques).items():
+            motor_manager.set_torques(values, sync)
+
+    def split_by_bus(self, values):
+        bus_values = {}
+        for name, value in values.items():
+            if name in self.motor_buses:
+                bus_values.setdefault(self.motor_buses[name], {})[name] = value
+        return bus_values
+
+    def merge_buses(self, method):
+        merged = {}
+        for motor_manager in self.buses.values():
+            merged.update(getattr(motor_manager, method)())
+        return merged
+
+    def get_positions(self):
+        return self.merge_buses('get_positions')
+
+    def get_velocities(self):
+        return self.merge_buses('get_velocities')
+
+    def get_accelerations(self):
+        return self.merge_buses('get_accelerations')
+
+    def get_torques(self):
+        return self.merge_buses('get_torques')
+
+    def get_state_snapshot(self):
+        """Get the newest SYNC cycle published by every bus joined into one snapshot. Without
+        a cycle in common, the last cycle of each bus is joined and marked incomplete
+        """
+        recents = [motor_manager.state_table.recent for motor_manager in self.buses.values()]
+        if recents and all(recents):
+            cycles = set.intersection(*({snapshot.cycle for snapshot in recent} for recent in recents))
+            if cycles:
+                cycle = max(cycles)
+                return StateSnapshot.merge([next(snapshot for snapshot in reversed(recent) if snapshot.cycle == cycle)
+                                            for recent in recents])
+        return StateSnapshot.merge([motor_manager.get_state_snapshot() for motor_manager in self.buses.values()])
+
+    def get_motor_states(self):
+        return self.get_state_snapshot().get_motor_states()
+
+    def get_error_codes(self):
+        return self.merge_buses('get_error_codes')
+
+    def get_errors(self):
+        return self.merge_buses('get_errors')
+
+    def get_faulted_motors(self):
+        return self.merge_buses('get_faulted_motors')
+
+    def add_fault_callback(self, callback):
+        for motor_manager in self.buses.values():
+            motor_manager.add_fault_callback(callback)
+
+    def get_sync_statistics(self):
+        """Get {channel: SYNC timing statistics}"""
+        return {channel: motor_manager.sync_producer.get_statistics()
+                for channel, motor_manager in self.buses.items()}
+
+    def check_motor_states(self):
+        states = self.get_motor_states()
+        error_motor = [
+            name for name, state in states.items()
+            if state['fault'] or state['switch_on_disabled'] or not state['operation_enabled']
+        ]
+        return states, bool(error_motor), error_motor
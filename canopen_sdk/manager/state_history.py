@@ -0,0 +1,100 @@
+import math
+from array import array
+from bisect import bisect_right
+
+class StateHistory:
+    """The last duration seconds of the state table, one row of all joints per
+    published SYNC cycle, in preallocated rings.
+
+    Every cycle is written twice, at row i and row i + capacity, so the newest
+    rows are always one contiguous block. window() therefore returns zero-copy
+    memoryviews of shape (rows, joints) that numpy.asarray() wraps without
+    copying. A window is not a copy: its oldest rows are overwritten as new
+    cycles come in, so copy it to keep it for longer than a SYNC period.
+    The rings are sized from period, or the running SYNC period if None.
+    """
+    def __init__(self, motor_manager, duration=5.0, period=None):
+        self.state_table = motor_manager.state_table
+        self.sync_producer = motor_manager.sync_producer
+        self.duration = duration
+        self.period = period
+        self.names = ()
+        self.capacity = 0
+        self.rings = {}
+        self.cycles = array('d')
+        self.timestamps = array('d')
+        self.count = 0
+        self.running = False
+
+    def start(self):
+        """Allocate the rings for the current joints and record every published SYNC cycle"""
+        if self.running:
+            return
+        period = self.period or self.sync_producer.period
+        if not period:
+            raise ValueError("SYNC period is unknown, pass period or start SYNC before the history")
+        self.names = self.state_table.names
+        self.capacity = max(int(math.ceil(self.duration / period)), 1)
+        size = 2 * self.capacity * len(self.names)
+        self.rings = {field: array('d', bytes(8 * size)) for field in self.state_table.FIELDS}
+        self.cycles = array('d', bytes(16 * self.capacity))
+        self.timestamps = array('d', bytes(16 * self.capacity))
+        self.count = 0
+        self.state_table.add_listener(self.on_snapshot)
+        self.running = True
+
+    def stop(self):
+        self.state_table.remove_listener(self.on_snapshot)
+        self.running = False
+
+    def on_snapshot(self, snapshot):
+        # Called with every published cycle, only ever from the receive thread
+        joint_count = len(self.names)
+        if snapshot.names != self.names:
+            return
+        row = self.count % self.capacity
+        start = row * joint_count
+        second = start + self.capacity * joint_count
+        data = snapshot.data
+        for i, ring in enumerate(self.rings.values()):
+            column = data[i * joint_count:(i + 1) * joint_count]
+            ring[start:start + joint_count] = column
+            ring[second:second + joint_count] = column
+        self.cycles[row] = self.cycles[row + self.capacity] = snapshot.cycle
+        self.timestamps[row] = self.timestamps[row + self.capacity] = snapshot.timestamp
+        # Published last, readers never see a row being written
+        self.count += 1
+
+    def get_row_range(self, seconds=None):
+        """Get (first, last) rows in the doubled rings of the cycles of the last seconds,
+        all recorded cycles if seconds is None
+        """
+        rows = min(self.count, self.capacity)
+        last = (self.count - 1) % self.capacity + self.capacity + 1
+        first = last - rows
+        if seconds is not None and rows:
+            timestamps = memoryview(self.timestamps)[first:last]
+            first += bisect_right(timestamps, timestamps[-1] - seconds)
+        return first, last
+
+    def window(self, field, seconds=None, row_range=None):
+        """Get the last seconds of field for all joints as a (rows, joints) memoryview,
+        rows in time order and joints in names order. Pass one get_row_range() to
+        several calls to get windows of the same cycles
+        """
+        joint_count = len(self.names)
+        first, last = row_range or self.get_row_range(seconds)
+        if first == last:
+            return memoryview(array('d'))
+        view = memoryview(self.rings[field])[first * joint_count:last * joint_count]
+        return view.cast('B').cast('d', (last - first, joint_count))
+
+    def window_timestamps(self, seconds=None, row_range=None):
+        """Get the receive timestamps of the cycles in window(field, seconds)"""
+        first, last = row_range or self.get_row_range(seconds)
+        return memoryview(self.timestamps)[first:last]
+
+    def window_cycles(self, seconds=None, row_range=None):
+        """Get the SYNC cycle numbers of the cycles in window(field, seconds)"""
+        first, last = row_range or self.get_row_range(seconds)
+        return memoryview(self.cycles)[first:last]
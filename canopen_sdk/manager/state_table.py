@@ -0,0 +1,231 @@
+import time
+from array import array
+from canopen_sdk.common import BaseMotorInterface
+
+class StateSnapshot:
+    """State of all joints stored column by column in one array of doubles.
+
+    Each field is a contiguous column with one value per joint, so view() is
+    zero-copy and can be wrapped with numpy.frombuffer if needed.
+    """
+    FIELDS = BaseMotorInterface.STATE_FIELDS
+
+    def __init__(self, names, data, cycle=0, timestamp=0.0, complete=False):
+        self.names = names
+        self.data = data
+        # SYNC cycle the values belong to and receive time of its last TPDO
+        self.cycle = cycle
+        self.timestamp = timestamp
+        self.complete = complete
+
+    def view(self, field):
+        """Get a zero-copy view of one field for all joints"""
+        joint_count = len(self.names)
+        start = self.FIELDS.index(field) * joint_count
+        return memoryview(self.data)[start:start + joint_count]
+
+    def get(self, field):
+        """Get {name: value} of one field"""
+        return dict(zip(self.names, self.view(field)))
+
+    @classmethod
+    def merge(cls, snapshots):
+        """Join snapshots of disjoint joints, e.g. from several buses, into one,
+        complete only if all of them are complete and of the same SYNC cycle
+        """
+        names = ()
+        data = array('d')
+        for snapshot in snapshots:
+            names += tuple(snapshot.names)
+        for field in cls.FIELDS:
+            for snapshot in snapshots:
+                data.frombytes(snapshot.view(field).cast('B'))
+        cycles = {snapshot.cycle for snapshot in snapshots}
+        return cls(names, data, min(cycles, default=0),
+                   max((snapshot.timestamp for snapshot in snapshots), default=0.0),
+                   len(cycles) <= 1 and all(snapshot.complete for snapshot in snapshots))
+
+    def get_motor_states(self):
+        """Get {name: state} in the format of BaseMotorInterface.get_motor_state"""
+        statuswords = self.view('statusword')
+        timestamps = self.view('timestamp')
+        positions = self.view('position')
+        velocities = self.view('velocity')
+        accelerations = self.view('acceleration')
+        torques = self.view('torque')
+        states = {}
+        for i, name in enumerate(self.names):
+            statusword = int(statuswords[i]) if timestamps[i] else None
+            states[name] = {
+                'position': positions[i],
+                'velocity': velocities[i],
+                'acceleration': accelerations[i],
+                'torque': torques[i],
+                'statusword': statusword,
+                'operation_enabled': bool(statusword and statusword & (1 << 2)),
+                'fault': bool(statusword and statusword & (1 << 3)),
+                'switch_on_disabled': bool(statusword and statusword & (1 << 6)),
+            }
+        return states
+
+class StateTable(StateSnapshot):
+    """Shared state table the TPDO callbacks of all motors write into in place.
+
+    The synchronous TPDOs of one SYNC cycle are counted as they arrive, all in
+    the receive thread, so no other thread touches the cycle. Each TPDO is seen
+    before and after the motors decode it. When the last one is in, an
+    immutable copy of the table is published by swapping the published
+    reference, so readers never take a lock and never see two cycles mixed. A
+    cycle is published as incomplete, before the values of the next cycle are
+    written, when a TPDO of the next cycle arrives first: a TPDO it already
+    has, or any TPDO a SYNC period or more after its first one. Cycles without
+    any TPDO are counted from that gap.
+
+    Given the SYNC schedule, a cycle is numbered by the SYNC it follows, so
+    tables of buses on one shared schedule number the same cycle alike; the
+    frames of a SYNC sent a period late take the number of the next one. The
+    last RECENT_CYCLES published cycles are kept in recent.
+    """
+    RECENT_CYCLES = 8
+
+    def __init__(self):
+        super().__init__((), array('d'))
+        self.motors = []
+        self.published = StateSnapshot((), array('d'))
+        # SYNC period, set when SYNC starts; 0 counts one cycle per gap
+        self.period = 0.0
+        # One bit per TPDO sent on every SYNC, {pdo_map: bit}
+        self.cycle_pdos = {}
+        self.expected_bits = 0
+        self.received_bits = 0
+        self.cycle_start = None
+        self.frame_timestamp = 0.0
+        self.sync_cycle = 0
+        # First SYNC of the schedule, time.time clock as frame timestamps, and its cycle number
+        self.schedule_start = None
+        self.first_cycle = 1
+        self.recent = ()
+        self.incomplete_cycles = 0
+        self.listeners = []
+
+    def add_motor(self, motor):
+        """Add a motor, or replace the motor with the same name, and rebind all motors"""
+        names = list(self.names)
+        if motor.name in names:
+            self.motors[names.index(motor.name)] = motor
+        else:
+            names.append(motor.name)
+            self.motors.append(motor)
+        self.names = tuple(names)
+
+        # Columns change length, so the table is rebuilt and every motor rebound
+        self.data = array('d', bytes(8 * len(self.motors) * len(self.FIELDS)))
+        for i, joint in enumerate(self.motors):
+            joint.bind_state(self.data, i, len(self.motors))
+
+    def add_cycle_pdo(self, pdo_map):
+        """Count a TPDO sent on every SYNC towards cycle completion"""
+        if pdo_map not in self.cycle_pdos:
+            self.cycle_pdos[pdo_map] = 1 << len(self.cycle_pdos)
+            self.expected_bits |= self.cycle_pdos[pdo_map]
+        # Around the motor callbacks, also when they were added again after a restart
+        callbacks = [callback for callback in pdo_map.callbacks
+                     if callback != self.begin_frame and callback != self.on_frame]
+        pdo_map.callbacks[:] = [self.begin_frame] + callbacks + [self.on_frame]
+
+    def clear_cycle_pdos(self):
+        """Forget the TPDOs counted towards cycle completion, call before adding them again"""
+        for pdo_map in self.cycle_pdos:
+            pdo_map.callbacks[:] = [callback for callback in pdo_map.callbacks
+                                    if callback != self.begin_frame and callback != self.on_frame]
+        self.cycle_pdos = {}
+        self.expected_bits = 0
+        self.received_bits = 0
+
+    def add_listener(self, callback):
+        """Call callback(snapshot) with every published SYNC cycle, from the receive thread"""
+        # Replaced, not changed in place, so the receive thread can iterate without a lock
+        self.listeners = self.listeners + [callback]
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners = [other for other in self.listeners if other != callback]
+
+    def begin_frame(self, pdo_map):
+        # Called in the receive thread before the motor callbacks, so a cycle left
+        # incomplete is published without the values of the next one
+        received_bits = self.received_bits
+        if received_bits and (received_bits & self.cycle_pdos[pdo_map] or
+                              self.period and self.is_next_cycle(pdo_map.timestamp)):
+            # First TPDO of the next cycle, the current one stays incomplete
+            self.publish(self.frame_timestamp, False)
+            self.incomplete_cycles += 1
+            self.received_bits = 0
+
+    def on_frame(self, pdo_map):
+        # Called in the receive thread after the motor callbacks
+        timestamp = pdo_map.timestamp
+        received_bits = self.received_bits
+        if not received_bits:
+            self.start_cycle(timestamp)
+        received_bits |= self.cycle_pdos[pdo_map]
+        self.frame_timestamp = timestamp
+        if received_bits == self.expected_bits:
+            received_bits = 0
+            self.publish(timestamp, True)
+        self.received_bits = received_bits
+
+    def is_next_cycle(self, timestamp):
+        # A frame after the next SYNC of the schedule, or a period after the cycle start
+        if self.schedule_start is not None:
+            return self.scheduled_cycle(timestamp) > self.sync_cycle
+        return timestamp - self.cycle_start >= self.period
+
+    def scheduled_cycle(self, timestamp):
+        # Number of the last SYNC of the schedule before timestamp
+        return self.first_cycle + int((timestamp - self.schedule_start) // self.period)
+
+    def start_cycle(self, timestamp):
+        if self.schedule_start is not None:
+            # Taken from the schedule, not counted, so the frames of a late SYNC do not
+            # shift the numbers of the cycles after it
+            cycle = self.scheduled_cycle(timestamp)
+        elif self.cycle_start is not None and self.period:
+            cycle = self.sync_cycle + max(int((timestamp - self.cycle_start) / self.period + 0.5), 1)
+        else:
+            cycle = self.sync_cycle + 1
+        if self.cycle_start is not None and cycle > self.sync_cycle + 1:
+            # SYNC cycles since the previous one, those between had no TPDO at all
+            self.incomplete_cycles += cycle - self.sync_cycle - 1
+        self.sync_cycle = cycle
+        self.cycle_start = timestamp
+
+    def reset_cycles(self, period, start_time=None, first_cycle=1):
+        """Restart cycle counting for a SYNC period, call before SYNC starts. With
+        start_time, the time.perf_counter time of SYNC number first_cycle, cycles
+        are numbered from that schedule
+        """
+        self.period = period
+        self.received_bits = 0
+        self.cycle_start = None
+        self.schedule_start = None
+        if start_time is not None:
+            self.schedule_start = start_time + time.time() - time.perf_counter()
+            self.first_cycle = first_cycle
+
+    def publish(self, timestamp, complete):
+        snapshot = StateSnapshot(self.names, self.data[:], self.sync_cycle, timestamp, complete)
+        self.published = snapshot
+        # Replaced, not changed in place, so readers need no lock
+        self.recent = self.recent[1 - self.RECENT_CYCLES:] + (snapshot,)
+        for callback in self.listeners:
+            callback(snapshot)
+
+    def snapshot(self):
+        """Copy the live table in one call, not aligned to a SYNC cycle"""
+        return StateSnapshot(self.names, self.data[:])
+
+    def latest(self):
+        """Get the last published SYNC cycle, or a live copy before the first one"""
+        published = self.published
+        return published if published.cycle else self.snapshot()
@@ -0,0 +1,160 @@
+import time
+import threading
+
+class SyncProducer:
+    """Transmits the SYNC message of a network.
+
+    Without callbacks SYNC is sent by the periodic task of the CAN interface
+    (network.sync), e.g. the kernel broadcast manager on socketcan, which has
+    no host jitter. Callbacks added with add_callback run right before every
+    SYNC frame, so RPDOs they send are latched by the drives on that SYNC; SYNC
+    is then sent by a timing thread, on the same schedule.
+    """
+    def __init__(self, network):
+        self.network = network
+        self.period = None
+        self.callbacks = []
+        self._cycle = 0
+
+        # Timing statistics, a cycle is late when SYNC leaves after late_threshold * period
+        self.late_threshold = 0.1
+        self.late_cycles = 0
+        self.missed_cycles = 0
+        self.max_lateness = 0.0
+
+        # Callbacks that raised, SYNC goes on without them
+        self.callback_errors = 0
+        self.last_callback_error = None
+        self._thread = None
+        self._start_time = None
+        self._next_time = None
+        self._periodic_start_time = None
+        self._stop_event = threading.Event()
+
+    @property
+    def cycle(self):
+        """Number of the last SYNC sent"""
+        if self._periodic_start_time is not None:
+            elapsed = time.perf_counter() - self._periodic_start_time
+            return self._cycle + int(elapsed / self.period) + 1
+        return self._cycle
+
+    @cycle.setter
+    def cycle(self, value):
+        self._cycle = value
+
+    def add_callback(self, callback):
+        """Add a callback called with the cycle counter before every SYNC"""
+        if callback in self.callbacks:
+            return
+        # Replaced, not changed in place, so the SYNC thread can iterate without a lock
+        self.callbacks = self.callbacks + [callback]
+        if self._periodic_start_time is not None:
+            self._reschedule()
+
+    def remove_callback(self, callback):
+        """Remove a callback added with add_callback"""
+        if callback in self.callbacks:
+            self.callbacks = [other for other in self.callbacks if other != callback]
+            if not self.callbacks and self._thread is not None \
+                    and threading.current_thread() is not self._thread:
+                self._reschedule()
+
+    def start(self, period=None, start_time=None):
+        """Start periodic transmission of the SYNC message, the first one at start_time
+        (time.perf_counter clock) if given so several producers share one schedule
+        """
+        if period is not None:
+            self.period = period
+        if not self.period:
+            raise ValueError("A valid transmission period has not been given")
+
+        self.stop()
+        if self.callbacks:
+            self._stop_event.clear()
+            self._start_time = start_time
+            self._thread = threading.Thread(target=self._run, name='canopen-sdk-sync', daemon=True)
+            self._thread.start()
+        else:
+            if start_time is not None:
+                delay = start_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            self._periodic_start_time = time.perf_counter()
+            self.network.sync.start(self.period)
+
+    def stop(self):
+        """Stop periodic transmission of the SYNC message"""
+        if self._periodic_start_time is not None:
+            self.network.sync.stop()
+            self._cycle = self.cycle
+            self._periodic_start_time = None
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def _reschedule(self):
+        # Switch between the periodic task and the thread, keeping the SYNC schedule
+        if self._periodic_start_time is not None:
+            next_time = self._periodic_start_time + (self.cycle - self._cycle) * self.period
+        else:
+            next_time = self._next_time
+        self.start(self.period, next_time)
+
+    def is_running(self):
+        return self._thread is not None or self._periodic_start_time is not None
+
+    def reset_statistics(self):
+        self.late_cycles = 0
+        self.missed_cycles = 0
+        self.max_lateness = 0.0
+        self.callback_errors = 0
+
+    def get_statistics(self):
+        """Get SYNC timing statistics, lateness is only measured while the thread sends SYNC"""
+        return {
+            'cycle': self.cycle,
+            'late_cycles': self.late_cycles,
+            'missed_cycles': self.missed_cycles,
+            'callback_errors': self.callback_errors,
+            'max_lateness': self.max_lateness,
+        }
+
+    def _run(self):
+        next_time = time.perf_counter()
+        if self._start_time is not None:
+            next_time = self._start_time
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                self._stop_event.wait(delay)
+        while not self._stop_event.is_set():
+            self._cycle += 1
+            for callback in self.callbacks:
+                try:
+                    callback(self._cycle)
+                except Exception as e:
+                    # A failing callback must not stop SYNC in the middle of a motion
+                    self.callback_errors += 1
+                    self.last_callback_error = e
+            self.network.sync.transmit()
+
+            lateness = time.perf_counter() - next_time
+            if lateness > self.max_lateness:
+                self.max_lateness = lateness
+            if lateness > self.late_threshold * self.period:
+                self.late_cycles += 1
+
+            # Absolute schedule, so a late cycle does not shift the following ones
+            next_time += self.period
+            self._next_time = next_time
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            elif delay < -self.period:
+                # Too late, skip the lost periods instead of bursting SYNCs, on the same schedule
+                missed = int(-delay / self.period)
+                self.missed_cycles += missed
+                self._cycle += missed
+                next_time += missed * self.period
+                self._next_time = next_time
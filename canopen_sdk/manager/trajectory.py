@@ -0,0 +1,77 @@
+INTERPOLATION_METHODS = ('linear', 'cubic', 'quintic')
+
+def interpolate_trajectory(times, positions, period, method='linear'):
+    """Resample a trajectory given by way-point times and positions to one sample per period.
+
+    times and positions may be lists or NumPy arrays. The cubic and quintic methods
+    estimate way-point velocities (and accelerations) by finite differences and start
+    and stop at rest.
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method: {method}, expected one of {INTERPOLATION_METHODS}")
+    times = [float(t) for t in times]
+    positions = [float(p) for p in positions]
+    if len(times) != len(positions):
+        raise ValueError(f"times and positions differ in length: {len(times)} != {len(positions)}")
+    if not times:
+        return []
+    if any(t1 <= t0 for t0, t1 in zip(times, times[1:])):
+        raise ValueError("times must be strictly increasing")
+    if len(times) == 1:
+        return positions
+
+    velocities = _estimate_derivatives(times, positions)
+    accelerations = _estimate_derivatives(times, velocities)
+
+    samples = []
+    segment = 0
+    last = len(times) - 1
+    count = int((times[-1] - times[0]) / period + 1e-9) + 1
+    for k in range(count):
+        t = times[0] + k * period
+        while segment < last - 1 and t > times[segment + 1]:
+            segment += 1
+        t0, t1 = times[segment], times[segment + 1]
+        p0, p1 = positions[segment], positions[segment + 1]
+        h = t1 - t0
+        tau = t - t0
+        if method == 'linear':
+            samples.append(p0 + (p1 - p0) * tau / h)
+        elif method == 'cubic':
+            samples.append(_cubic(p0, p1, velocities[segment], velocities[segment + 1], h, tau))
+        else:
+            samples.append(_quintic(p0, p1, velocities[segment], velocities[segment + 1],
+                                    accelerations[segment], accelerations[segment + 1], h, tau))
+
+    # Always end exactly on the last way-point
+    if times[0] + (count - 1) * period < times[-1]:
+        samples.append(positions[-1])
+    return samples
+
+def _estimate_derivatives(times, values):
+    # Mean of the neighbouring slopes, zero at both ends
+    derivatives = [0.0] * len(values)
+    for i in range(1, len(values) - 1):
+        slope_before = (values[i] - values[i - 1]) / (times[i] - times[i - 1])
+        slope_after = (values[i + 1] - values[i]) / (times[i + 1] - times[i])
+        derivatives[i] = (slope_before + slope_after) / 2
+    return derivatives
+
+def _cubic(p0, p1, v0, v1, h, tau):
+    # Cubic Hermite segment
+    s = tau / h
+    s2 = s * s
+    s3 = s2 * s
+    return ((2 * s3 - 3 * s2 + 1) * p0 + (s3 - 2 * s2 + s) * h * v0
+            + (-2 * s3 + 3 * s2) * p1 + (s3 - s2) * h * v1)
+
+def _quintic(p0, p1, v0, v1, a0, a1, h, tau):
+    # Quintic segment matching position, velocity and acceleration at both ends
+    # Remaining position, velocity and acceleration to cover after the quadratic part
+    dp = p1 - p0 - v0 * h - a0 * h * h / 2
+    dv = (v1 - v0 - a0 * h) * h
+    da = (a1 - a0) * h * h
+    c3 = (10 * dp - 4 * dv + da / 2) / h ** 3
+    c4 = (-15 * dp + 7 * dv - da) / h ** 4
+    c5 = (6 * dp - 3 * dv + da / 2) / h ** 5
+    return p0 + tau * (v0 + tau * (a0 / 2 + tau * (c3 + tau * (c4 + tau * c5))))
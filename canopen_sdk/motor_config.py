@@ -0,0 +1,175 @@
+import os
+import json
+from canopen_sdk.common import BaseMotorInterface
+from canopen_sdk.driver_registry import get_driver, get_vendor_types
+
+PI = 3.141592653589793
+
+# Required fields have no default
+REQUIRED = object()
+
+NUMBER = (int, float)
+
+class MotorConfigError(ValueError):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"Invalid motor config ({len(errors)} error(s)): " + '; '.join(errors))
+
+class MotorConfig:
+    """One validated motor of a motor config file.
+
+    Fields are checked against FIELDS, missing ones are taken from the DEFAULTS
+    of the vendor's driver loader and then from FIELDS.
+    """
+    # field: (type, default)
+    FIELDS = {
+        'vendor_type':          (str, REQUIRED),
+        'node_id':              (int, REQUIRED),
+        'name':                 (str, None),
+        'channel':              (str, None),
+        'pulse_per_revolution': (int, 1000),
+        'zero_offset':          (NUMBER, 0),
+        'operation_mode':       (str, 'PROFILE_POSITION'),
+        'profile_velocity':     (NUMBER, 1.0),
+        'profile_acceleration': (NUMBER, 1.0),
+        'profile_deceleration': (NUMBER, 1.0),
+        'min_position_limit':   (NUMBER, -1.0),
+        'max_position_limit':   (NUMBER, 1.0),
+        'parameters':           (dict, None),
+        'tpdo_intervals':       (dict, None),
+    }
+
+    __slots__ = tuple(FIELDS)
+
+    def __init__(self, **fields):
+        for field, value in fields.items():
+            setattr(self, field, value)
+        if self.name is None:
+            self.name = f"joint_{self.node_id}"
+
+    def __repr__(self):
+        return f"MotorConfig({self.name!r}, {self.vendor_type!r}, node_id={self.node_id})"
+
+    @classmethod
+    def from_dict(cls, data):
+        """Validate one motor config dict, MotorConfigError lists every problem found"""
+        errors = []
+        label = data.get('name') or f"node {data.get('node_id')}"
+        unknown = sorted(set(data) - set(cls.FIELDS))
+        if unknown:
+            errors.append(f"{label}: unknown fields {unknown}")
+
+        vendor_type = data.get('vendor_type')
+        defaults = {}
+        if vendor_type is not None:
+            try:
+                defaults = getattr(get_driver(vendor_type), 'DEFAULTS', {})
+            except ValueError:
+                errors.append(f"{label}: unknown vendor_type {vendor_type!r}, "
+                              f"expected one of {get_vendor_types()}")
+
+        fields = {}
+        invalid = set()
+        for field, (field_type, default) in cls.FIELDS.items():
+            value = data.get(field, defaults.get(field, default))
+            if value is REQUIRED:
+                errors.append(f"{label}: {field} is required")
+                invalid.add(field)
+            elif (value is not None or default is not None) and \
+                    (isinstance(value, bool) or not isinstance(value, field_type)):
+                errors.append(f"{label}: {field} must be {_type_name(field_type)}, got {value!r}")
+                invalid.add(field)
+            fields[field] = value
+
+        # Values are checked for every field of the right type, so all problems are listed at once
+        errors.extend(cls.check_values(label, fields, invalid))
+        if errors:
+            raise MotorConfigError(errors)
+        return cls(**fields)
+
+    @staticmethod
+    def check_values(label, fields, invalid=()):
+        """Check the values of fields, skipping checks on the invalid fields"""
+        invalid = set(invalid)
+
+        def valid(*names):
+            return not invalid.intersection(names)
+
+        errors = []
+        if valid('node_id') and not 1 <= fields['node_id'] <= 127:
+            errors.append(f"{label}: node_id must be 1 to 127, got {fields['node_id']}")
+        if valid('operation_mode') and fields['operation_mode'] not in BaseMotorInterface.OPERATION_MODES:
+            errors.append(f"{label}: unknown operation_mode {fields['operation_mode']!r}")
+        if valid('pulse_per_revolution') and fields['pulse_per_revolution'] <= 0:
+            errors.append(f"{label}: pulse_per_revolution must be positive")
+        for field in ('profile_velocity', 'profile_acceleration', 'profile_deceleration'):
+            if valid(field) and fields[field] <= 0:
+                errors.append(f"{label}: {field} must be positive")
+        if valid('min_position_limit', 'max_position_limit'):
+            if fields['min_position_limit'] >= fields['max_position_limit']:
+                errors.append(f"{label}: min_position_limit must be below max_position_limit")
+            elif valid('pulse_per_revolution') and fields['pulse_per_revolution'] > 0:
+                # Position limits are written as 32-bit pulse counts
+                scale = fields['pulse_per_revolution'] / (2 * PI)
+                for field in ('min_position_limit', 'max_position_limit'):
+                    if not -2 ** 31 <= fields[field] * scale < 2 ** 31:
+                        errors.append(f"{label}: {field} exceeds the 32-bit pulse range")
+        intervals = fields['tpdo_intervals'] if valid('tpdo_intervals') else None
+        for signal, interval in (intervals or {}).items():
+            if isinstance(interval, bool) or not isinstance(interval, int) or not 1 <= interval <= 240:
+                errors.append(f"{label}: tpdo_intervals[{signal!r}] must be 1 to 240, got {interval!r}")
+        return errors
+
+def load_motor_configs(motor_config_file_path, channel=None):
+    """Read and validate every motor of a JSON or YAML motor config file.
+
+    Motors without a channel are put on channel. Names must be unique and node
+    IDs unique per channel; MotorConfigError lists every problem in the file.
+    """
+    # Check if file exists
+    if not os.path.exists(motor_config_file_path):
+        raise FileNotFoundError(f"Motor config file not found: {motor_config_file_path}")
+
+    # Load Motor Config
+    with open(motor_config_file_path, 'r') as f:
+        if motor_config_file_path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("YAML motor configs need PyYAML: pip install canopen_sdk[yaml]") from None
+            motor_configs = yaml.safe_load(f) or {}
+        else:
+            motor_configs = json.load(f)
+
+    configs = []
+    errors = []
+    for data in motor_configs.get('motors', []):
+        if not isinstance(data, dict):
+            errors.append(f"motor config must be a mapping, got {data!r}")
+            continue
+        try:
+            config = MotorConfig.from_dict(data)
+        except MotorConfigError as e:
+            errors.extend(e.errors)
+            continue
+        if config.channel is None:
+            config.channel = channel
+        configs.append(config)
+
+    names = set()
+    node_ids = set()
+    for config in configs:
+        if config.name in names:
+            errors.append(f"{config.name}: name is used twice")
+        if (config.channel, config.node_id) in node_ids:
+            errors.append(f"{config.name}: node_id {config.node_id} is used twice on {config.channel}")
+        names.add(config.name)
+        node_ids.add((config.channel, config.node_id))
+    if errors:
+        raise MotorConfigError(errors)
+    return configs
+
+def _type_name(field_type):
+    if field_type is NUMBER:
+        return 'a number'
+    return {str: 'a string', int: 'an integer', dict: 'a mapping'}[field_type]
@@ -0,0 +1,4 @@
+from canopen_sdk.simulator.simulated_drive import SimulatedDrive
+from canopen_sdk.simulator.drive_simulator import DriveSimulator
+
+__all__ = ['SimulatedDrive', 'DriveSimulator']
@@ -0,0 +1,56 @@
+import os
+import canopen
+from canopen_sdk.common.object_dictionary_cache import ObjectDictionaryCache
+from canopen_sdk.simulator.simulated_drive import SimulatedDrive
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OBJECT_DICTIONARY_FILES = {
+    'eRob': os.path.join(PACKAGE_DIR, 'erob', 'ZeroErr_Driver_V1.5.eds'),
+    'elmo': os.path.join(PACKAGE_DIR, 'elmo', 'elmo.dcf'),
+}
+
+class DriveSimulator:
+    """Simulated eRob and Elmo drives sharing one python-can bus.
+
+    Connect a MotorManager to the same channel and bustype (the python-can
+    'virtual' bus by default) to run the whole SDK without hardware.
+    """
+    def __init__(self, channel='canopen_sdk_sim', bustype='virtual'):
+        self.channel = channel
+        self.bustype = bustype
+        self.network = canopen.Network()
+        self.drives = {}
+        self.object_dictionaries = ObjectDictionaryCache()
+
+    def add_drive(self, node_id, vendor_type='eRob', **kwargs):
+        if vendor_type not in OBJECT_DICTIONARY_FILES:
+            raise ValueError(f"Unknown vendor type: {vendor_type}")
+        object_dictionary = self.object_dictionaries.get(OBJECT_DICTIONARY_FILES[vendor_type], node_id)
+        drive = SimulatedDrive(node_id, object_dictionary, **kwargs)
+        self.drives[node_id] = drive
+        if self.network.bus is not None:
+            drive.associate_network(self.network)
+        return drive
+
+    def add_drives(self, motor_configs):
+        """Add one drive per entry of the 'motors' list of motor_config.json"""
+        for motor_config in motor_configs:
+            self.add_drive(motor_config['node_id'], motor_config['vendor_type'])
+
+    def start(self):
+        self.network.connect(channel=self.channel, interface=self.bustype)
+        for drive in self.drives.values():
+            drive.associate_network(self.network)
+
+    def stop(self):
+        for drive in self.drives.values():
+            drive.stop()
+        self.network.disconnect()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.stop()
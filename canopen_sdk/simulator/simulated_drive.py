@@ -0,0 +1,316 @@
+import time
+import queue
+import struct
+import threading
+import canopen
+from canopen_sdk.common import BaseMotorInterface
+
+STATES = BaseMotorInterface.STATES
+OPERATION_MODES = BaseMotorInterface.OPERATION_MODES
+
+# Statusword bits besides the state
+VOLTAGE_ENABLED = 1 << 4
+REMOTE = 1 << 9
+TARGET_REACHED = 1 << 10
+SETPOINT_ACKNOWLEDGE = 1 << 12
+
+# Objects kept as live values instead of in the object dictionary data store
+CONTROLWORD = 0x6040
+STATUSWORD = 0x6041
+ERROR_CODE = 0x603F
+MODES_OF_OPERATION = 0x6060
+MODES_OF_OPERATION_DISPLAY = 0x6061
+POSITION_ACTUAL_VALUE = 0x6064
+VELOCITY_ACTUAL_VALUE = 0x606C
+TARGET_TORQUE = 0x6071
+MOTOR_RATED_CURRENT = 0x6075
+TORQUE_ACTUAL_VALUE = 0x6077
+TARGET_POSITION = 0x607A
+PROFILE_VELOCITY = 0x6081
+INTERPOLATION_DATA_RECORD = 0x60C1
+
+class SimulatedDrive:
+    """CiA 402 drive simulated on a canopen LocalNode.
+
+    The SDO server, NMT slave and EMCY producer come from the LocalNode. The
+    drive adds the CiA 402 state machine, applies the PDO mapping written by the
+    master over SDO, consumes RPDOs and answers every SYNC with its TPDOs.
+
+    With sdo_latency (seconds) SDO requests are answered that long after they
+    arrive, one at a time by a worker thread of the drive, as a drive busy with
+    its own processing would.
+    """
+    def __init__(self, node_id, object_dictionary, motor_rated_current=1000, sdo_latency=0.0):
+        self.node = canopen.LocalNode(node_id, object_dictionary)
+        self.node_id = node_id
+        self.node.add_read_callback(self.on_read)
+        self.node.add_write_callback(self.on_write)
+        self.motor_rated_current = motor_rated_current
+        self.network = None
+        self.tpdos = []
+        self.rpdos = {}
+        self.pdo_dirty = True
+        self.sync_count = 0
+        self.last_sync_timestamp = None
+        self.sdo_latency = sdo_latency
+        self.sdo_requests = queue.Queue()
+        self.sdo_thread = None
+        self.seed_pdo_parameters()
+        self.reset()
+
+    def seed_pdo_parameters(self):
+        """Give every PDO parameter its object dictionary default, 0 where it has none,
+        so the master can read the whole PDO configuration (e.g. the mapping counts of elmo.dcf)
+        """
+        od = self.node.object_dictionary
+        for index in range(0x1400, 0x1C00):
+            if index not in od:
+                continue
+            obj = od[index]
+            for var in (obj.values() if hasattr(obj, 'values') else [obj]):
+                if var.default is None:
+                    self.node.set_data(index, var.subindex, var.encode_raw(0), check_writable=False)
+
+    def reset(self):
+        """Power-on state of the drive"""
+        self.state = 'SWITCH_ON_DISABLED'
+        self.setpoint_acknowledge = False
+        self.profile_target = 0
+        self.position = 0.0
+        self.objects = {
+            CONTROLWORD: 0,
+            ERROR_CODE: 0,
+            MODES_OF_OPERATION_DISPLAY: OPERATION_MODES['PROFILE_POSITION'],
+            POSITION_ACTUAL_VALUE: 0,
+            VELOCITY_ACTUAL_VALUE: 0,
+            TORQUE_ACTUAL_VALUE: 0,
+            TARGET_POSITION: 0,
+            TARGET_TORQUE: 0,
+            MOTOR_RATED_CURRENT: self.motor_rated_current,
+            PROFILE_VELOCITY: 0,
+            INTERPOLATION_DATA_RECORD: 0,
+        }
+
+    def associate_network(self, network):
+        self.network = network
+        network.add_node(self.node)
+        network.subscribe(0, self.on_nmt_command)
+        network.subscribe(canopen.sync.SyncProducer.cob_id, self.on_sync)
+        if self.sdo_latency and self.sdo_thread is None:
+            # Requests go to the worker instead of being answered in the receive thread
+            network.unsubscribe(self.node.sdo.rx_cobid, self.node.sdo.on_request)
+            network.subscribe(self.node.sdo.rx_cobid, self.on_sdo_request)
+            self.sdo_thread = threading.Thread(target=self._answer_sdo_requests,
+                                               name=f'canopen-sdk-sim-sdo-{self.node_id}', daemon=True)
+            self.sdo_thread.start()
+
+    def stop(self):
+        """Stop the SDO worker"""
+        if self.sdo_thread is not None:
+            self.sdo_requests.put(None)
+            self.sdo_thread.join()
+            self.sdo_thread = None
+
+    def on_sdo_request(self, can_id, data, timestamp):
+        self.sdo_requests.put((time.perf_counter() + self.sdo_latency, can_id, bytes(data), timestamp))
+
+    def _answer_sdo_requests(self):
+        while True:
+            request = self.sdo_requests.get()
+            if request is None:
+                return
+            due, can_id, data, timestamp = request
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.node.sdo.on_request(can_id, data, timestamp)
+
+    # Object access
+
+    def get_statusword(self):
+        mask, value = STATES[self.state]
+        statusword = value | REMOTE
+        if self.state != 'SWITCH_ON_DISABLED' and self.state != 'NOT_READY_TO_SWITCH_ON':
+            statusword |= VOLTAGE_ENABLED
+        if self.setpoint_acknowledge:
+            statusword |= SETPOINT_ACKNOWLEDGE
+        if int(self.position) == self.profile_target:
+            statusword |= TARGET_REACHED
+        return statusword
+
+    def read_object(self, index, subindex=0):
+        if index == STATUSWORD:
+            return self.get_statusword()
+        if index in self.objects:
+            return self.objects[index]
+        od = self.node._find_object(index, subindex)
+        return od.decode_raw(self.node.get_data(index, subindex))
+
+    def write_object(self, index, subindex, value):
+        if index == CONTROLWORD:
+            self.on_controlword(value)
+        elif index == MODES_OF_OPERATION:
+            self.objects[MODES_OF_OPERATION_DISPLAY] = value
+        elif index in self.objects:
+            self.objects[index] = value
+
+    def on_read(self, index, subindex, od):
+        if index == STATUSWORD or index in self.objects:
+            return self.read_object(index, subindex)
+        return None
+
+    def on_write(self, index, subindex, od, data):
+        if 0x1400 <= index < 0x1C00:
+            self.pdo_dirty = True
+        else:
+            self.write_object(index, subindex, od.decode_raw(data))
+
+    # CiA 402 state machine
+
+    def on_controlword(self, controlword):
+        previous = self.objects[CONTROLWORD]
+        self.objects[CONTROLWORD] = controlword
+        state = self.state
+
+        if controlword & 0x80:
+            if not previous & 0x80 and state == 'FAULT':
+                self.objects[ERROR_CODE] = 0
+                self.node.emcy.reset()
+                self.state = 'SWITCH_ON_DISABLED'
+            return
+        if state in ('FAULT', 'FAULT_REACTION_ACTIVE'):
+            return
+
+        if controlword & 0x02 == 0:
+            # Disable voltage
+            self.state = 'SWITCH_ON_DISABLED'
+        elif controlword & 0x04 == 0:
+            # Quick stop
+            self.state = 'QUICK_STOP_ACTIVE' if state == 'OPERATION_ENABLED' else 'SWITCH_ON_DISABLED'
+        elif controlword & 0x87 == 0x06:
+            # Shutdown
+            if state in ('SWITCH_ON_DISABLED', 'SWITCHED_ON', 'OPERATION_ENABLED'):
+                self.state = 'READY_TO_SWITCH_ON'
+        elif controlword & 0x8F == 0x07:
+            # Switch on, or disable operation
+            if state in ('READY_TO_SWITCH_ON', 'OPERATION_ENABLED'):
+                self.state = 'SWITCHED_ON'
+        elif controlword & 0x8F == 0x0F:
+            # Enable operation
+            if state in ('SWITCHED_ON', 'QUICK_STOP_ACTIVE'):
+                self.state = 'OPERATION_ENABLED'
+                self.profile_target = int(self.position)
+                self.objects[TARGET_POSITION] = self.profile_target
+
+        if self.state == 'QUICK_STOP_ACTIVE':
+            self.state = 'SWITCH_ON_DISABLED'
+
+        # Profile position new set-point: rising edge of bit 4, or every write with change set immediately
+        if self.objects[MODES_OF_OPERATION_DISPLAY] == OPERATION_MODES['PROFILE_POSITION']:
+            if controlword & 0x10 and (not previous & 0x10 or controlword & 0x20):
+                self.profile_target = self.objects[TARGET_POSITION]
+                self.setpoint_acknowledge = True
+            elif not controlword & 0x10:
+                self.setpoint_acknowledge = False
+
+    def inject_fault(self, error_code=0x5530):
+        """Enter FAULT and send an EMCY with the given error code"""
+        self.state = 'FAULT'
+        self.objects[ERROR_CODE] = error_code
+        self.node.emcy.send(error_code, 0x01)
+
+    # Network
+
+    def on_nmt_command(self, can_id, data, timestamp):
+        command, node_id = data[0], data[1]
+        if node_id in (0, self.node_id) and command in (0x81, 0x82):
+            # Reset node or communication, then boot up into PRE-OPERATIONAL
+            if command == 0x81:
+                self.reset()
+            self.pdo_dirty = True
+            self.node.nmt.state = 'PRE-OPERATIONAL'
+            self.network.send_message(0x700 + self.node_id, [0])
+
+    def load_pdo_mapping(self):
+        """Compile the PDO configuration written by the master"""
+        for cob_id in self.rpdos:
+            self.network.unsubscribe(cob_id, self.on_rpdo)
+        self.tpdos = [pdo for pdo in (self.read_pdo(0x1800 + i, 0x1A00 + i) for i in range(4)) if pdo]
+        self.rpdos = {pdo[0]: pdo for pdo in (self.read_pdo(0x1400 + i, 0x1600 + i) for i in range(4)) if pdo}
+        for cob_id in self.rpdos:
+            self.network.subscribe(cob_id, self.on_rpdo)
+        self.pdo_dirty = False
+
+    def read_pdo(self, com_index, map_index):
+        try:
+            cob_id = self.read_object(com_index, 1)
+            trans_type = self.read_object(com_index, 2)
+            count = self.read_object(map_index, 0)
+            entries = [self.read_object(map_index, subindex) for subindex in range(1, count + 1)]
+        except (KeyError, canopen.SdoAbortedError):
+            return None
+        if cob_id & 0x80000000 or not entries:
+            return None
+
+        fmt = '<'
+        variables = []
+        for entry in entries:
+            index, subindex = entry >> 16, (entry >> 8) & 0xFF
+            od = self.node._find_object(index, subindex)
+            fmt += od.STRUCT_TYPES[od.data_type].format.lstrip('<>')
+            variables.append((index, subindex))
+        return cob_id & 0x7FF, trans_type, struct.Struct(fmt), variables
+
+    def on_rpdo(self, can_id, data, timestamp):
+        if self.node.nmt.state != 'OPERATIONAL':
+            return
+        cob_id, trans_type, pdo_struct, variables = self.rpdos[can_id]
+        controlword = None
+        for (index, subindex), value in zip(variables, pdo_struct.unpack_from(data)):
+            if index == CONTROLWORD:
+                controlword = value
+            else:
+                self.write_object(index, subindex, value)
+
+        # Targets first, so a new set-point bit picks up the target of the same frame
+        if controlword is not None:
+            self.on_controlword(controlword)
+
+    def on_sync(self, can_id, data, timestamp):
+        if self.pdo_dirty:
+            self.load_pdo_mapping()
+        dt = 0.0 if self.last_sync_timestamp is None else timestamp - self.last_sync_timestamp
+        self.last_sync_timestamp = timestamp
+        self.sync_count += 1
+        self.update(dt)
+
+        if self.node.nmt.state != 'OPERATIONAL':
+            return
+        for cob_id, trans_type, pdo_struct, variables in self.tpdos:
+            if trans_type == 0 or (trans_type <= 240 and self.sync_count % trans_type == 0):
+                values = [self.read_object(index, subindex) for index, subindex in variables]
+                self.network.send_message(cob_id, pdo_struct.pack(*values))
+
+    # Motion
+
+    def update(self, dt):
+        """Move the simulated motor by one SYNC period"""
+        objects = self.objects
+        previous_position = self.position
+        if self.state != 'OPERATION_ENABLED':
+            objects[TORQUE_ACTUAL_VALUE] = 0
+        else:
+            mode = objects[MODES_OF_OPERATION_DISPLAY]
+            if mode == OPERATION_MODES['PROFILE_POSITION']:
+                step = objects[PROFILE_VELOCITY] * dt
+                error = self.profile_target - self.position
+                self.position += max(-step, min(step, error)) if step else error
+            elif mode == OPERATION_MODES['CYCLIC_SYNC_POSITION']:
+                self.position = objects[TARGET_POSITION]
+            elif mode == OPERATION_MODES['INTERPOLATED_POSITION']:
+                self.position = objects[INTERPOLATION_DATA_RECORD]
+            elif mode in (OPERATION_MODES['PROFILE_TORQUE'], OPERATION_MODES['CYCLIC_SYNC_TORQUE']):
+                objects[TORQUE_ACTUAL_VALUE] = objects[TARGET_TORQUE]
+
+        objects[POSITION_ACTUAL_VALUE] = int(self.position)
+        objects[VELOCITY_ACTUAL_VALUE] = int((self.position - previous_position) / dt) if dt else 0
@@ -10,9 +10,12 @@ setup(
 		'canopen==2.3.0',
 		'python-can==4.5.0'
 	],
+	extras_require={
+		'yaml': ['PyYAML']
+	},
 	packages=find_packages(exclude=[]),
 	keywords=['canopen'],
 	python_requires='>=3.6',
-	package_data={},
+	package_data={'canopen_sdk': ['erob/*.eds', 'elmo/*.dcf']},
 	zip_safe=False
 )